@@ -0,0 +1,47 @@
+"""add accessible theaters index
+
+Revision ID: 2a7e9c3d8b46
+Revises: f6a83b0c5e19
+Create Date: 2024-12-08 09:47:26.138550
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2a7e9c3d8b46'
+down_revision: Union[str, None] = 'f6a83b0c5e19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Partial index: the accessible-only bounding box search only walks accessible theaters
+    op.create_index(
+        'ix_theaters_accessible_latitude_longitude',
+        'theaters',
+        ['latitude', 'longitude'],
+        unique=False,
+        postgresql_where=sa.text('accessibility = true'),
+    )
+
+    # Same for the earthdistance prefilter, when the extension was installed by 9d2c6e4b1f83
+    installed = op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_extension WHERE extname = 'earthdistance'")
+    ).scalar()
+    if installed:
+        op.execute(
+            """
+            CREATE INDEX ix_theaters_accessible_ll_to_earth ON theaters
+            USING gist (ll_to_earth(latitude, longitude))
+            WHERE accessibility = true AND latitude IS NOT NULL AND longitude IS NOT NULL
+            """
+        )
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS ix_theaters_accessible_ll_to_earth')
+    op.drop_index('ix_theaters_accessible_latitude_longitude', table_name='theaters')
@@ -0,0 +1,35 @@
+"""add movie facet indexes
+
+Revision ID: 3b8e5d0f4a17
+Revises: 7c3f9a1d2b64
+Create Date: 2024-12-02 11:40:09.472113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e5d0f4a17'
+down_revision: Union[str, None] = '7c3f9a1d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_movies_genre'), 'movies', ['genre'], unique=False)
+    op.create_index(op.f('ix_movies_language'), 'movies', ['language'], unique=False)
+    op.create_index(op.f('ix_movies_mood'), 'movies', ['mood'], unique=False)
+    op.create_index(op.f('ix_movies_average_rating'), 'movies', ['average_rating'], unique=False)
+    # Backs the "showing between" EXISTS probe of search_movies
+    op.create_index('ix_showtimes_movie_id_show_time', 'showtimes', ['movie_id', 'show_time'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_showtimes_movie_id_show_time', table_name='showtimes')
+    op.drop_index(op.f('ix_movies_average_rating'), table_name='movies')
+    op.drop_index(op.f('ix_movies_mood'), table_name='movies')
+    op.drop_index(op.f('ix_movies_language'), table_name='movies')
+    op.drop_index(op.f('ix_movies_genre'), table_name='movies')
@@ -0,0 +1,41 @@
+"""add seat holds
+
+Revision ID: 5d1b8f3e6a27
+Revises: 8e5b2f7a4c90
+Create Date: 2024-12-10 11:05:38.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1b8f3e6a27'
+down_revision: Union[str, None] = '8e5b2f7a4c90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'seat_holds',
+        sa.Column('hold_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('hold_token', sa.String(), nullable=False),
+        sa.Column('showtime_id', sa.Integer(), nullable=False),
+        sa.Column('seat_no', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['showtime_id'], ['showtimes.showtime_id'], ),
+        sa.PrimaryKeyConstraint('hold_id'),
+        sa.UniqueConstraint('showtime_id', 'seat_no', name='uq_seat_holds_showtime_id_seat_no'),
+    )
+    op.create_index(op.f('ix_seat_holds_hold_token'), 'seat_holds', ['hold_token'], unique=False)
+    op.create_index(op.f('ix_seat_holds_expires_at'), 'seat_holds', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_seat_holds_expires_at'), table_name='seat_holds')
+    op.drop_index(op.f('ix_seat_holds_hold_token'), table_name='seat_holds')
+    op.drop_table('seat_holds')
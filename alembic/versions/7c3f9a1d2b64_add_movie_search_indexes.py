@@ -0,0 +1,52 @@
+"""add movie search indexes
+
+Revision ID: 7c3f9a1d2b64
+Revises: e1024dcfdffe
+Create Date: 2024-11-30 18:12:45.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3f9a1d2b64'
+down_revision: Union[str, None] = 'e1024dcfdffe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # Weighted full-text document: name > cast > description. Kept in sync by Postgres itself.
+    op.execute(
+        """
+        ALTER TABLE movies ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(movie_name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce("cast", '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(movie_description, '')), 'C')
+        ) STORED
+        """
+    )
+    op.create_index('ix_movies_search_vector', 'movies', ['search_vector'], postgresql_using='gin')
+
+    # Trigram indexes back the similarity (%) and word similarity (%>) operators
+    for column in ('movie_name', 'cast', 'movie_description'):
+        op.create_index(
+            f'ix_movies_{column}_trgm',
+            'movies',
+            [column],
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    for column in ('movie_name', 'cast', 'movie_description'):
+        op.drop_index(f'ix_movies_{column}_trgm', table_name='movies')
+    op.drop_index('ix_movies_search_vector', table_name='movies')
+    op.drop_column('movies', 'search_vector')
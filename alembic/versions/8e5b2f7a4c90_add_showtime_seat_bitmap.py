@@ -0,0 +1,41 @@
+"""add showtime seat bitmap
+
+Revision ID: 8e5b2f7a4c90
+Revises: 2a7e9c3d8b46
+Create Date: 2024-12-09 17:12:44.573018
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e5b2f7a4c90'
+down_revision: Union[str, None] = '2a7e9c3d8b46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('showtimes', sa.Column('seat_bitmap', sa.BigInteger(), server_default='0', nullable=False))
+
+    # Fold the booked seatmap rows into the bitmap: seat <row><n> is bit (row - 'A') * 9 + n - 1
+    op.execute(
+        """
+        UPDATE showtimes SET seat_bitmap = booked.bitmap
+        FROM (
+            SELECT showtime_id,
+                   bit_or(1::bigint << ((ascii(substr(seat_no, 1, 1)) - ascii('A')) * 9 + substr(seat_no, 2)::int - 1)) AS bitmap
+            FROM seatmap
+            WHERE seat_status AND seat_no ~ '^[A-G][1-9]$'
+            GROUP BY showtime_id
+        ) AS booked
+        WHERE showtimes.showtime_id = booked.showtime_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('showtimes', 'seat_bitmap')
@@ -0,0 +1,44 @@
+"""add theater geo indexes
+
+Revision ID: 9d2c6e4b1f83
+Revises: 3b8e5d0f4a17
+Create Date: 2024-12-05 16:21:37.904215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2c6e4b1f83'
+down_revision: Union[str, None] = '3b8e5d0f4a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Backs the latitude/longitude bounding box prefilter (THEATER_GEO_BACKEND=bbox)
+    op.create_index('ix_theaters_latitude_longitude', 'theaters', ['latitude', 'longitude'], unique=False)
+
+    # earthdistance ships with contrib and is not installed everywhere, so only index it when available
+    available = op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'earthdistance'")
+    ).scalar()
+    if available:
+        op.execute('CREATE EXTENSION IF NOT EXISTS cube')
+        op.execute('CREATE EXTENSION IF NOT EXISTS earthdistance')
+        # Backs the earth_box(...) @> ll_to_earth(...) prefilter (THEATER_GEO_BACKEND=earthdistance)
+        op.execute(
+            """
+            CREATE INDEX ix_theaters_ll_to_earth ON theaters
+            USING gist (ll_to_earth(latitude, longitude))
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+            """
+        )
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS ix_theaters_ll_to_earth')
+    op.drop_index('ix_theaters_latitude_longitude', table_name='theaters')
@@ -0,0 +1,59 @@
+"""add seat layouts
+
+Revision ID: b7e4a2c9d103
+Revises: 5d1b8f3e6a27
+Create Date: 2024-12-11 15:22:09.417306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4a2c9d103'
+down_revision: Union[str, None] = '5d1b8f3e6a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    seat_layouts = op.create_table(
+        'seat_layouts',
+        sa.Column('layout_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('theater_id', sa.String(), nullable=True),
+        sa.Column('screen', sa.String(), nullable=False),
+        sa.Column('rows', sa.String(), nullable=False),
+        sa.Column('columns', sa.Integer(), nullable=False),
+        sa.Column('gaps', sa.JSON(), nullable=False),
+        sa.Column('categories', sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(['theater_id'], ['theaters.theater_id'], ),
+        sa.PrimaryKeyConstraint('layout_id'),
+        sa.UniqueConstraint('theater_id', 'screen', name='uq_seat_layouts_theater_id_screen'),
+    )
+
+    # The layout every screen used so far; showtimes without a layout_id fall back to it
+    op.bulk_insert(seat_layouts, [
+        {
+            'theater_id': None,
+            'screen': 'default',
+            'rows': 'ABCDEFG',
+            'columns': 9,
+            'gaps': [],
+            'categories': [
+                {'name': 'Recliner', 'rows': 'AB', 'price': 700},
+                {'name': 'Gold', 'rows': 'CD', 'price': 500},
+                {'name': 'Silver', 'rows': 'EFG', 'price': 300},
+            ],
+        },
+    ])
+
+    op.add_column('showtimes', sa.Column('layout_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_showtimes_layout_id_seat_layouts', 'showtimes', 'seat_layouts', ['layout_id'], ['layout_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('fk_showtimes_layout_id_seat_layouts', 'showtimes', type_='foreignkey')
+    op.drop_column('showtimes', 'layout_id')
+    op.drop_table('seat_layouts')
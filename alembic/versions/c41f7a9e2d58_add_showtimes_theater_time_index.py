@@ -0,0 +1,27 @@
+"""add showtimes theater time index
+
+Revision ID: c41f7a9e2d58
+Revises: 9d2c6e4b1f83
+Create Date: 2024-12-06 10:05:52.617340
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f7a9e2d58'
+down_revision: Union[str, None] = '9d2c6e4b1f83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Turns "showtimes of a theater in a time range" into an index range scan
+    op.create_index('ix_showtimes_theater_id_show_time', 'showtimes', ['theater_id', 'show_time'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_showtimes_theater_id_show_time', table_name='showtimes')
@@ -0,0 +1,55 @@
+"""add location coordinates
+
+Revision ID: d3a8f1c6e925
+Revises: b7e4a2c9d103
+Create Date: 2024-12-12 10:41:53.208114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a8f1c6e925'
+down_revision: Union[str, None] = 'b7e4a2c9d103'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Centre of each MumbaiSuburbs location, so suburbs without geocoded theaters still have a place on the map
+COORDINATES = {
+    "andheri": (19.1136, 72.8697),
+    "bandra": (19.0596, 72.8295),
+    "borivali": (19.2307, 72.8567),
+    "dadar": (19.0178, 72.8478),
+    "goregaon": (19.1663, 72.8526),
+    "juhu": (19.1075, 72.8263),
+    "kandivali": (19.2045, 72.8376),
+    "malad": (19.1874, 72.8484),
+    "mulund": (19.1726, 72.9560),
+    "powai": (19.1176, 72.9060),
+    "santacruz": (19.0843, 72.8360),
+    "thane": (19.2183, 72.9781),
+    "versova": (19.1351, 72.8146),
+    "vile parle": (19.0990, 72.8470),
+    "wadala": (19.0163, 72.8580),
+}
+
+
+def upgrade() -> None:
+    op.add_column('locations', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('locations', sa.Column('longitude', sa.Float(), nullable=True))
+
+    locations = sa.table('locations', sa.column('name_key'), sa.column('latitude'), sa.column('longitude'))
+    for name_key, (latitude, longitude) in COORDINATES.items():
+        op.execute(
+            locations.update()
+            .where(locations.c.name_key == name_key)
+            .values(latitude=latitude, longitude=longitude)
+        )
+
+
+def downgrade() -> None:
+    op.drop_column('locations', 'longitude')
+    op.drop_column('locations', 'latitude')
@@ -0,0 +1,90 @@
+"""add locations dimension
+
+Revision ID: f6a83b0c5e19
+Revises: c41f7a9e2d58
+Create Date: 2024-12-07 14:32:18.250961
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a83b0c5e19'
+down_revision: Union[str, None] = 'c41f7a9e2d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Values of the MumbaiSuburbs enum in dataDump/theaters_dump.py, with the alternative spellings people use
+LOCATIONS = {
+    "Andheri": ["andheri east", "andheri west", "andheri e", "andheri w"],
+    "Bandra": ["bandra east", "bandra west", "bandra e", "bandra w", "bandra kurla complex", "bkc"],
+    "Borivali": ["borivli", "borivali east", "borivali west"],
+    "Dadar": ["dadar east", "dadar west", "dadar tt"],
+    "Goregaon": ["goregaon east", "goregaon west"],
+    "Juhu": ["juhu beach"],
+    "Kandivali": ["kandivli", "kandivali east", "kandivali west"],
+    "Malad": ["malad east", "malad west"],
+    "Mulund": ["mulund east", "mulund west"],
+    "Powai": ["hiranandani", "powai lake"],
+    "Santacruz": ["santa cruz", "santacruz east", "santacruz west"],
+    "Thane": ["thane west", "thane east", "thana"],
+    "Versova": ["andheri versova", "seven bungalows"],
+    "Vile Parle": ["vileparle", "vile parle east", "vile parle west", "parle"],
+    "Wadala": ["wadala east", "wadala west"],
+}
+
+
+def upgrade() -> None:
+    locations = op.create_table('locations',
+    sa.Column('location_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('name_key', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('location_id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_locations_name_key'), 'locations', ['name_key'], unique=True)
+    aliases = op.create_table('location_aliases',
+    sa.Column('alias_key', sa.String(), nullable=False),
+    sa.Column('location_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['location_id'], ['locations.location_id'], ),
+    sa.PrimaryKeyConstraint('alias_key')
+    )
+    op.create_index(op.f('ix_location_aliases_location_id'), 'location_aliases', ['location_id'], unique=False)
+
+    op.add_column('theaters', sa.Column('location_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_theaters_location_id', 'theaters', 'locations', ['location_id'], ['location_id'])
+    op.create_index(op.f('ix_theaters_location_id'), 'theaters', ['location_id'], unique=False)
+
+    # Seed the dimension with explicit ids so the aliases can reference them
+    op.bulk_insert(locations, [
+        {"location_id": location_id, "name": name, "name_key": name.casefold()}
+        for location_id, name in enumerate(LOCATIONS, start=1)
+    ])
+    op.bulk_insert(aliases, [
+        {"alias_key": alias, "location_id": location_id}
+        for location_id, names in enumerate(LOCATIONS.values(), start=1)
+        for alias in names
+    ])
+    op.execute("SELECT setval('locations_location_id_seq', (SELECT max(location_id) FROM locations))")
+
+    # Backfill the foreign key from the free-text location
+    op.execute(
+        """
+        UPDATE theaters SET location_id = locations.location_id
+        FROM locations
+        WHERE locations.name_key = lower(trim(theaters.theater_location))
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_theaters_location_id'), table_name='theaters')
+    op.drop_constraint('fk_theaters_location_id', 'theaters', type_='foreignkey')
+    op.drop_column('theaters', 'location_id')
+    op.drop_index(op.f('ix_location_aliases_location_id'), table_name='location_aliases')
+    op.drop_table('location_aliases')
+    op.drop_index(op.f('ix_locations_name_key'), table_name='locations')
+    op.drop_table('locations')
@@ -1,48 +1,138 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+import os
+from sqlalchemy.orm import Session, aliased, joinedload
+from sqlalchemy import select, func, exists, cast, Float
 from database import get_db  # Import the get_db function
 from schemas.models import Movie, Showtime, Theater  # SQLAlchemy model
+from utils.movie_index import movie_text_index, movie_to_dict
+from utils.catalog_cache import catalog_cache
+from utils.semantic_index import semantic_index
+from utils.facet_rankings import facet_rankings
+from utils.pagination import paginate_query, paginate_sorted
+from utils.now_showing import now_showing, parse_show_time
+from utils.theater_index import theaters_within
 from datetime import datetime
+from typing import List, Optional
 
-def get_movies_by_name(movie_name: str):
+# Backend for the text search tools (name, description, cast):
+# - "memory": in-process inverted index (default)
+# - "postgres": tsvector / pg_trgm indexes, ranked by ts_rank and trigram similarity
+# - "like": the original LIKE '%term%' / equality queries, kept for benchmarking
+MOVIE_SEARCH_BACKEND = os.getenv("MOVIE_SEARCH_BACKEND", "memory")
+
+def _search_movies_in_postgres(db, field: str, term: str, cursor=None, limit: int = 5):
+    """
+    Runs an index-backed, keyset-paginated text search in Postgres and returns the ranked movies with a `match_score`.
+    """
+    if field == "movie_name":
+        # Trigram similarity on the whole name (GIN gin_trgm_ops index)
+        score = func.similarity(Movie.movie_name, term)
+        condition = Movie.movie_name.op("%")(term)
+    elif field == "cast":
+        # Word similarity, so a single cast member matches inside the comma separated list
+        score = func.word_similarity(term, Movie.cast)
+        condition = Movie.cast.op("%>")(term)
+    else:
+        # Full-text match on the generated search_vector column (GIN index), with trigram fallback for typos
+        query = func.websearch_to_tsquery("english", term)
+        score = func.greatest(func.ts_rank(Movie.search_vector, query), func.word_similarity(term, Movie.movie_description))
+        condition = Movie.search_vector.op("@@")(query) | Movie.movie_description.op("%>")(term)
+
+    # Scores are real (float4); widen them so the value round-tripped through the cursor compares exactly
+    score = cast(score, Float).label("match_score")
+
+    return paginate_query(
+        db,
+        select(Movie, score).where(condition),
+        [(score, True), (Movie.movie_id, False)],
+        cursor=cursor,
+        limit=limit,
+        row_key=lambda row: (row.match_score, row.Movie.movie_id),
+        to_dict=lambda row: dict(movie_to_dict(row.Movie), match_score=round(row.match_score, 3)),
+    )
+
+def _paginate_movies(db, query, cursor=None, limit: int = 5):
+    """
+    Keyset-paginates a SELECT of Movie rows by movie_id.
+    """
+    return paginate_query(
+        db,
+        query,
+        [(Movie.movie_id, False)],
+        cursor=cursor,
+        limit=limit,
+        row_key=lambda row: (row.Movie.movie_id,),
+        to_dict=lambda row: movie_to_dict(row.Movie),
+    )
+
+def _text_match_key(movie):
+    return (-movie["match_score"], -movie["average_rating"], movie["movie_id"])
+
+@catalog_cache.cached
+def get_movies_by_name(movie_name: str, cursor: Optional[str] = None, limit: int = 5):
     """
-    This function fetches the top 5 movies that have a specific name.
+    This function fetches the top 5 movies whose name matches the given name. Matching ignores case and
+    tolerates typos or partial titles, so pass the name exactly as the user wrote it.
 
     Args:
     - movie_name: The name of the movie to search for.
+    - cursor: Optional `next_cursor` from a previous call, to fetch the next page of results.
+    - limit: Number of movies per page (default is 5).
 
     Returns:
-    - List of top 5 movies that match the given name, unmarshalled into a dictionary.
+    - A dictionary with `results`, the matching movies (best match first) unmarshalled into a dictionary, and
+      `next_cursor`, to pass back for more results (None when there are no more).
+      Each movie carries a `similarity` score; 1.0 means an exact (case-insensitive) match.
     """
-    with next(get_db()) as db:
-        results = db.execute(
-            select(Movie).where(Movie.movie_name == movie_name)
-            .limit(5)  # Limit to top 5 results
-        ).scalars().all()
+    if MOVIE_SEARCH_BACKEND == "postgres":
+        with next(get_db()) as db:
+            return _search_movies_in_postgres(db, "movie_name", movie_name, cursor=cursor, limit=limit)
 
-        # Convert the result to dictionary format
-        return [movie.__dict__ for movie in results]
+    if MOVIE_SEARCH_BACKEND == "like":
+        with next(get_db()) as db:
+            return _paginate_movies(db, select(Movie).where(Movie.movie_name == movie_name), cursor=cursor, limit=limit)
 
-def get_movies_by_description(description: str):
+    # Resolved against the in-memory trigram index of movie names
+    return paginate_sorted(
+        movie_text_index.resolve_name(movie_name, limit=None),
+        lambda movie: (-movie["similarity"], movie["movie_name"], movie["movie_id"]),
+        cursor=cursor,
+        limit=limit,
+    )
+
+@catalog_cache.cached
+def get_movies_by_description(description: str, cursor: Optional[str] = None, limit: int = 5):
     """
     This function fetches the top 5 movies whose description contains a specific keyword or phrase.
 
     Args:
     - description: The keyword or phrase to search for in the movie description.
+    - cursor: Optional `next_cursor` from a previous call, to fetch the next page of results.
+    - limit: Number of movies per page (default is 5).
 
     Returns:
-    - List of top 5 movies whose description matches the given keyword or phrase, unmarshalled into a dictionary.
+    - A dictionary with `results`, the movies whose description matches the given keyword or phrase unmarshalled
+      into a dictionary, and `next_cursor`, to pass back for more results (None when there are no more).
+      Movies must contain every search term (common words such as "the" aside, partial words allowed) and are
+      ranked by how many they contain as whole words (see `match_score`).
     """
-    with next(get_db()) as db:
-        results = db.execute(
-            select(Movie).where(Movie.movie_description.like(f"%{description}%"))
-            .limit(5)  # Limit to top 5 results
-        ).scalars().all()
-        
-        # Convert the result to dictionary format
-        return [movie.__dict__ for movie in results]
+    if MOVIE_SEARCH_BACKEND == "postgres":
+        with next(get_db()) as db:
+            return _search_movies_in_postgres(db, "movie_description", description, cursor=cursor, limit=limit)
+
+    if MOVIE_SEARCH_BACKEND == "like":
+        with next(get_db()) as db:
+            query = select(Movie).where(Movie.movie_description.like(f"%{description}%"))
+            return _paginate_movies(db, query, cursor=cursor, limit=limit)
 
-def get_movies_by_genre(genre: str):
+    # Answered from the in-memory inverted index instead of a LIKE '%...%' table scan
+    return paginate_sorted(
+        movie_text_index.search("movie_description", description, limit=None),
+        _text_match_key,
+        cursor=cursor,
+        limit=limit,
+    )
+
+def get_movies_by_genre(genre: str, cursor: Optional[str] = None, limit: int = 5):
     """
     This function fetches the top 5 movies of a specific genre.
 
@@ -63,58 +153,60 @@ def get_movies_by_genre(genre: str):
       - Horror
       - Tech Thriller
       - Slice of Life
+    - cursor: Optional `next_cursor` from a previous call, to fetch the next page of results.
+    - limit: Number of movies per page (default is 5).
 
     Returns:
-    - List of top 5 movies that belong to the given genre, unmarshalled into a dictionary.
+    - A dictionary with `results`, the best movies of the given genre (highest average rating, then most reviewed)
+      unmarshalled into a dictionary, and `next_cursor`, to pass back for more results (None when there are no more).
     """
-    with next(get_db()) as db:
-        results = db.execute(
-            select(Movie).where(Movie.genre == genre)
-            .limit(5)  # Limit to top 5 results
-        ).scalars().all()
-        
-        # Convert the result to dictionary format
-        return [movie.__dict__ for movie in results]
+    # Served from the precomputed ranking instead of an unordered LIMIT query
+    return facet_rankings.page("genre", genre, cursor=cursor, limit=limit)
 
-def get_movies_by_cast(cast: str):
+@catalog_cache.cached
+def get_movies_by_cast(cast: str, cursor: Optional[str] = None, limit: int = 5):
     """
     This function fetches the top 5 movies that feature a specific cast member.
 
     Args:
     - cast: The name of the cast member to search for.
+    - cursor: Optional `next_cursor` from a previous call, to fetch the next page of results.
+    - limit: Number of movies per page (default is 5).
 
     Returns:
-    - List of top 5 movies that feature the specified cast member, unmarshalled into a dictionary.
+    - A dictionary with `results`, the movies that feature the specified cast member unmarshalled into a dictionary,
+      and `next_cursor`, to pass back for more results (None when there are no more).
+      Movies must match every part of the name (partial parts allowed) and are ranked by how many they match
+      whole (see `match_score`).
     """
-    with next(get_db()) as db:
-        results = db.execute(
-            select(Movie).where(Movie.cast.like(f"%{cast}%"))
-            .limit(5)  # Limit to top 5 results
-        ).scalars().all()
-        
-        # Convert the result to dictionary format
-        return [movie.__dict__ for movie in results]
+    if MOVIE_SEARCH_BACKEND == "postgres":
+        with next(get_db()) as db:
+            return _search_movies_in_postgres(db, "cast", cast, cursor=cursor, limit=limit)
+
+    if MOVIE_SEARCH_BACKEND == "like":
+        with next(get_db()) as db:
+            return _paginate_movies(db, select(Movie).where(Movie.cast.like(f"%{cast}%")), cursor=cursor, limit=limit)
 
-def get_movies_by_language(language: str):
+    # Answered from the in-memory inverted index instead of a LIKE '%...%' table scan
+    return paginate_sorted(movie_text_index.search("cast", cast, limit=None), _text_match_key, cursor=cursor, limit=limit)
+
+def get_movies_by_language(language: str, cursor: Optional[str] = None, limit: int = 5):
     """
     This function fetches the top 5 movies that are in a specific language.
 
     Args:
     - language: The language to filter movies by.
+    - cursor: Optional `next_cursor` from a previous call, to fetch the next page of results.
+    - limit: Number of movies per page (default is 5).
 
     Returns:
-    - List of top 5 movies that are in the specified language, unmarshalled into a dictionary.
+    - A dictionary with `results`, the best movies in the specified language (highest average rating, then most
+      reviewed) unmarshalled into a dictionary, and `next_cursor`, to pass back for more results (None when there are no more).
     """
-    with next(get_db()) as db:
-        results = db.execute(
-            select(Movie).where(Movie.language == language)
-            .limit(5)  # Limit to top 5 results
-        ).scalars().all()
-        
-        # Convert the result to dictionary format
-        return [movie.__dict__ for movie in results]
+    # Served from the precomputed ranking instead of an unordered LIMIT query
+    return facet_rankings.page("language", language, cursor=cursor, limit=limit)
 
-def get_movies_by_mood(mood: str):
+def get_movies_by_mood(mood: str, cursor: Optional[str] = None, limit: int = 5):
     """
     This function fetches the top 5 movies that match a specific mood or theme.
 
@@ -135,108 +227,310 @@ def get_movies_by_mood(mood: str):
       - Haunting
       - Engaging
       - Lighthearted
+    - cursor: Optional `next_cursor` from a previous call, to fetch the next page of results.
+    - limit: Number of movies per page (default is 5).
 
     Returns:
-    - List of top 5 movies that match the given mood, unmarshalled into a dictionary.
+    - A dictionary with `results`, the best movies with the given mood (highest average rating, then most reviewed)
+      unmarshalled into a dictionary, and `next_cursor`, to pass back for more results (None when there are no more).
     """
-    with next(get_db()) as db:
-        results = db.execute(
-            select(Movie).where(Movie.mood == mood)
-            .limit(5)  # Limit to top 5 results
-        ).scalars().all()
-        
-        # Convert the result to dictionary format
-        return [movie.__dict__ for movie in results]
+    # Served from the precomputed ranking instead of an unordered LIMIT query
+    return facet_rankings.page("mood", mood, cursor=cursor, limit=limit)
 
-def get_movies_by_average_rating(min_rating: float, max_rating: float = None):
+def _paginate_by_rating(db, query, cursor=None, limit: int = 5):
+    """
+    Keyset-paginates a SELECT of Movie rows, highest average rating first.
+    """
+    return paginate_query(
+        db,
+        query,
+        [(Movie.average_rating, True), (Movie.movie_id, False)],
+        cursor=cursor,
+        limit=limit,
+        row_key=lambda row: (row.Movie.average_rating, row.Movie.movie_id),
+        to_dict=lambda row: movie_to_dict(row.Movie),
+    )
+
+@catalog_cache.cached
+def get_movies_by_average_rating(min_rating: float, max_rating: float = None, cursor: Optional[str] = None, limit: int = 5):
     """
     This function fetches the top 5 movies that have an average rating within a specific range.
 
     Args:
     - min_rating: The minimum rating for the movie to be included.
     - max_rating: The optional maximum rating for the movie to be included. If not provided, only the minimum rating is considered.
+    - cursor: Optional `next_cursor` from a previous call, to fetch the next page of results.
+    - limit: Number of movies per page (default is 5).
 
     Returns:
-    - List of top 5 movies that have an average rating within the specified range, unmarshalled into a dictionary.
+    - A dictionary with `results`, the movies with an average rating within the specified range (highest first)
+      unmarshalled into a dictionary, and `next_cursor`, to pass back for more results (None when there are no more).
     """
     with next(get_db()) as db:
         query = select(Movie).where(Movie.average_rating >= min_rating)
         if max_rating is not None:
             query = query.where(Movie.average_rating <= max_rating)
-        
-        results = db.execute(query.limit(5)).scalars().all()
-        
-        # Convert the result to dictionary format
-        return [movie.__dict__ for movie in results]
 
-def get_movies_by_showtime(start_time: str, end_time: str):
+        return _paginate_by_rating(db, query, cursor=cursor, limit=limit)
+
+def get_movies_by_showtime(start_time: str, end_time: str, cursor: Optional[str] = None, limit: int = 5):
     """
     This function fetches the top 5 movies that have showtimes within a specific time range.
 
     Args:
     - start_time: The start of the time range in 'YYYY-MM-DD HH:MM:SS' format.
     - end_time: The end of the time range in 'YYYY-MM-DD HH:MM:SS' format.
+    - cursor: Optional `next_cursor` from a previous call, to fetch the next page of results.
+    - limit: Number of movies per page (default is 5).
 
     Returns:
-    - List of top 5 movies with showtimes within the given range, unmarshalled into a dictionary.
+    - A dictionary with `results`, the distinct movies with showtimes within the given range unmarshalled into a
+      dictionary, each with its `next_show_time` in the range, and `next_cursor`, to pass back for more results
+      (None when there are no more).
     """
+    try:
+        start, end = parse_show_time(start_time), parse_show_time(end_time)
+    except ValueError:
+        return {"error": "start_time and end_time must be in 'YYYY-MM-DD HH:MM:SS' format."}
+
+    if now_showing.covers(start):
+        # Upcoming windows are answered from the hour-bucketed now showing index, without touching showtimes
+        movie_text_index.ensure_loaded()
+        movies = [
+            dict(movie_text_index.movies[movie_id], next_show_time=show_time)
+            for movie_id, show_time in now_showing.next_showtimes(start, end).items()
+            if movie_id in movie_text_index.movies
+        ]
+        movies.sort(key=lambda movie: movie["movie_id"])
+        return paginate_sorted(movies, lambda movie: (movie["movie_id"],), cursor=cursor, limit=limit)
+
     with next(get_db()) as db:
-        # Querying the Showtime and Movie tables based on the show_time range
-        results = db.execute(
-            select(Movie)
-            .join(Showtime, Showtime.movie_id == Movie.movie_id)
-            .where(Showtime.show_time >= start_time, Showtime.show_time <= end_time)
-            .limit(5)  # Limit to top 5 results
-        ).scalars().all()
-        
-        # Convert the result to dictionary format
-        return [movie.__dict__ for movie in results]
-    
-def get_movies_by_name_with_showtimes_and_theatres(movie_name: str):
+        # Windows reaching into the past fall back to SQL; the subquery yields each movie once with its first showtime
+        next_show_time = (
+            select(func.min(Showtime.show_time))
+            .where(Showtime.movie_id == Movie.movie_id, Showtime.show_time >= start, Showtime.show_time <= end)
+            .scalar_subquery()
+            .label("next_show_time")
+        )
+        return paginate_query(
+            db,
+            select(Movie, next_show_time).where(next_show_time.isnot(None)),
+            [(Movie.movie_id, False)],
+            cursor=cursor,
+            limit=limit,
+            row_key=lambda row: (row.Movie.movie_id,),
+            to_dict=lambda row: dict(movie_to_dict(row.Movie), next_show_time=row.next_show_time),
+        )
+
+def _cast_condition(cast: str):
     """
-    This function fetches the top 5 movies that have a specific name along with their showtimes and associated theater details.
+    Builds the WHERE clause for a cast filter using the configured text search backend.
+    """
+    if MOVIE_SEARCH_BACKEND == "postgres":
+        return Movie.cast.op("%>")(cast)
+    if MOVIE_SEARCH_BACKEND == "like":
+        return Movie.cast.like(f"%{cast}%")
+    # Resolve the cast member to movie ids in memory, so the database only sees a primary key filter
+    return Movie.movie_id.in_(movie_text_index.matching_ids("cast", cast))
+
+@catalog_cache.cached
+def search_movies(
+    genre: Optional[str] = None,
+    mood: Optional[str] = None,
+    language: Optional[str] = None,
+    cast: Optional[str] = None,
+    min_rating: Optional[float] = None,
+    max_rating: Optional[float] = None,
+    showing_between: Optional[List[str]] = None,
+    cursor: Optional[str] = None,
+    limit: int = 5,
+):
+    """
+    This function fetches the top rated movies matching any combination of filters in a single query.
+    Use it instead of calling several get_movies_by_* tools and combining their results, e.g.
+    "romantic Hindi movie rated above 4" is search_movies(mood="Romantic", language="Hindi", min_rating=4).
 
     Args:
-    - movie_name: The name of the movie to search for.
+    - genre: Optional genre to filter by. Valid genres include:
+      Sci-Fi, Romance, Action/Sci-Fi, Mystery/Thriller, Drama/Fantasy, Historical Drama, Adventure, Thriller,
+      Comedy/Drama, Action/Fantasy, Musical/Drama, Adventure/Drama, Horror, Tech Thriller, Slice of Life.
+    - mood: Optional mood to filter by. Valid moods include:
+      Intense, Romantic, Adventurous, Suspenseful, Emotional, Inspiring, Exciting, Creepy, Bittersweet, Heroic,
+      Uplifting, Tense, Haunting, Engaging, Lighthearted.
+    - language: Optional language to filter by.
+    - cast: Optional cast member name the movie must feature.
+    - min_rating: Optional minimum average rating (inclusive).
+    - max_rating: Optional maximum average rating (inclusive).
+    - showing_between: Optional [start_time, end_time] pair in 'YYYY-MM-DD HH:MM:SS' format; only movies with
+      at least one showtime in that range are returned.
+    - cursor: Optional `next_cursor` from a previous call with the same filters, to fetch the next page of results.
+    - limit: Number of movies per page (default is 5).
+
+    Returns:
+    - A dictionary with `results`, the matching movies ordered by average rating (highest first) unmarshalled into
+      a dictionary, and `next_cursor`, to pass back for more results (None when there are no more).
+    """
+    facets = {"genre": genre, "mood": mood, "language": language}
+    selected = [facet for facet, value in facets.items() if value]
+    if len(selected) == 1 and not (cast or showing_between) and min_rating is None and max_rating is None:
+        # A single facet is answered straight from the precomputed ranking
+        return facet_rankings.page(selected[0], facets[selected[0]], cursor=cursor, limit=limit)
+
+    conditions = []
+    if genre:
+        conditions.append(Movie.genre == genre)
+    if mood:
+        conditions.append(Movie.mood == mood)
+    if language:
+        conditions.append(Movie.language == language)
+    if cast:
+        conditions.append(_cast_condition(cast))
+    if min_rating is not None:
+        conditions.append(Movie.average_rating >= min_rating)
+    if max_rating is not None:
+        conditions.append(Movie.average_rating <= max_rating)
+    if showing_between:
+        if len(showing_between) != 2:
+            return {"error": "showing_between must be a [start_time, end_time] pair."}
+        try:
+            start, end = (parse_show_time(value) for value in showing_between)
+        except ValueError:
+            return {"error": "showing_between times must be in 'YYYY-MM-DD HH:MM:SS' format."}
+        if now_showing.covers(start):
+            conditions.append(Movie.movie_id.in_(list(now_showing.next_showtimes(start, end))))
+        else:
+            # EXISTS instead of a join, so a movie with several matching showtimes is returned once
+            conditions.append(exists().where(
+                Showtime.movie_id == Movie.movie_id,
+                Showtime.show_time >= start,
+                Showtime.show_time <= end,
+            ))
+
+    with next(get_db()) as db:
+        return _paginate_by_rating(db, select(Movie).where(*conditions), cursor=cursor, limit=limit)
+
+def get_movies_by_semantic_query(query: str, cursor: Optional[str] = None, limit: int = 5):
+    """
+    This function fetches the movies that best match a free-text description of what the user wants to watch,
+    e.g. "I'm feeling happy", "something scary" or "a feel-good love story". Use it when the user describes a
+    feeling or intent rather than an exact genre, mood, cast member or title.
+
+    Args:
+    - query: The user's request in their own words.
+    - cursor: Optional `next_cursor` from a previous call, to fetch the next page of results.
+    - limit: Number of movies per page (default is 5).
 
     Returns:
-    - List of top 5 movies that match the given name, including their showtimes and theater details, unmarshalled into a dictionary.
+    - A dictionary with `results`, the most similar movies unmarshalled into a dictionary, each with a `similarity`
+      score between 0 and 1, and `next_cursor`, to pass back for more results (None when there are no more).
+    """
+    movie_text_index.ensure_loaded()
+    matches = semantic_index.search([query], top_k=None)[0]
+
+    movies = [
+        dict(movie_text_index.movies[movie_id], similarity=similarity)
+        for movie_id, similarity in matches
+        if movie_id in movie_text_index.movies
+    ]
+    movies.sort(key=lambda movie: (-movie["similarity"], movie["movie_id"]))
+    return paginate_sorted(movies, lambda movie: (-movie["similarity"], movie["movie_id"]), cursor=cursor, limit=limit)
+
+def get_movies_by_name_with_showtimes_and_theatres(
+    movie_name: str,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    user_lat: Optional[float] = None,
+    user_lon: Optional[float] = None,
+    radius_km: float = 10,
+    limit: int = 3,
+    max_showtimes: int = 20,
+):
     """
+    This function answers "where and when is X playing": it fetches the movies matching a name together with their
+    upcoming showtimes and the theater of each showtime, in one call.
+
+    Args:
+    - movie_name: The name of the movie to search for (case-insensitive, typos are tolerated).
+    - start_time: Optional start of the time range in 'YYYY-MM-DD HH:MM:SS' format (default is now).
+    - end_time: Optional end of the time range in 'YYYY-MM-DD HH:MM:SS' format.
+    - user_lat: Optional latitude of the user's location; with user_lon, only theaters within radius_km are included.
+    - user_lon: Optional longitude of the user's location.
+    - radius_km: Radius in kilometers to search for theaters when a location is given (default is 10 km).
+    - limit: Maximum number of matching movies (default is 3).
+    - max_showtimes: Maximum number of showtimes returned per movie, earliest first (default is 20).
+
+    Returns:
+    - List of the best matching movies unmarshalled into a dictionary, each with a `similarity` score and its
+      `showtimes`, every showtime including its theater details (and `distance_km` when a location is given).
+    """
+    try:
+        start = parse_show_time(start_time) if start_time else datetime.now()
+        end = parse_show_time(end_time) if end_time else None
+    except ValueError:
+        return {"error": "start_time and end_time must be in 'YYYY-MM-DD HH:MM:SS' format."}
+
+    candidates = movie_text_index.resolve_name(movie_name, limit=limit)
+    if not candidates:
+        return []
+    if candidates[0]["similarity"] == 1.0:
+        # An exact title match needs no look-alikes next to it
+        candidates = [movie for movie in candidates if movie["similarity"] == 1.0]
+
+    # Showtime filters are applied in SQL, so only the matching showtimes are fetched
+    criteria = [Showtime.movie_id.in_([movie["movie_id"] for movie in candidates]), Showtime.show_time >= start]
+    if end is not None:
+        criteria.append(Showtime.show_time <= end)
+
+    distances = None
+    if user_lat is not None and user_lon is not None:
+        distances = {
+            theater["theater_id"]: theater["distance_km"]
+            for theater in theaters_within(user_lat, user_lon, radius_km)
+        }
+        if not distances:
+            return [dict(movie, showtimes=[]) for movie in candidates]
+        criteria.append(Showtime.theater_id.in_(list(distances)))
+
     with next(get_db()) as db:
-        # Query to fetch movies, showtimes, and theater details
-        results = db.execute(
-            select(Movie)
-            .join(Showtime, Showtime.movie_id == Movie.movie_id).limit(2)  # Join Movie with Showtime
-            .join(Theater, Theater.theater_id == Showtime.theater_id).limit(2)  # Join Showtime with Theater
-            .where(Movie.movie_name == movie_name)
-            .limit(2)  # Limit to top 5 results
+        # One query: the showtimes are numbered per movie so only the first max_showtimes of each leave the
+        # database, and each showtime's theater is joined in
+        ranked = (
+            select(
+                Showtime,
+                func.row_number().over(
+                    partition_by=Showtime.movie_id, order_by=(Showtime.show_time, Showtime.showtime_id)
+                ).label("movie_rank"),
+            )
+            .where(*criteria)
+            .subquery()
+        )
+        ranked_showtime = aliased(Showtime, ranked)
+        rows = db.execute(
+            select(ranked_showtime)
+            .where(ranked.c.movie_rank <= max_showtimes)
+            .options(joinedload(ranked_showtime.theater))
+            .order_by(ranked.c.show_time, ranked.c.showtime_id)
         ).scalars().all()
+        showtimes_by_movie = {}
+        for showtime in rows:
+            showtimes_by_movie.setdefault(showtime.movie_id, []).append(showtime)
 
-        # Convert the results to dictionary format including showtimes and theater details
         movies_with_showtimes = []
-        for movie in results:
-            movies_with_showtimes.append({
-                "movie_id": movie.movie_id,
-                "movie_name": movie.movie_name,
-                "movie_description": movie.movie_description,
-                "genre": movie.genre,
-                "cast": movie.cast,
-                "language": movie.language,
-                "mood": movie.mood,
-                "average_rating": movie.average_rating,
-                "showtimes": [
-                    {
-                        "showtime_id": showtime.showtime_id,
-                        "language": showtime.language,
-                        "show_time": showtime.show_time,
-                        "theater": {
-                            "theater_id": showtime.theater.theater_id,
-                            "theater_name": showtime.theater.theater_name,
-                            "theater_location": showtime.theater.theater_location
-                        }
-                    }
-                    for showtime in movie.showtimes  # Access the related showtimes
-                ]
-            })
+        for candidate in candidates:
+            showtimes = showtimes_by_movie.get(candidate["movie_id"], [])
+            movies_with_showtimes.append(dict(candidate, showtimes=[
+                {
+                    "showtime_id": showtime.showtime_id,
+                    "language": showtime.language,
+                    "show_time": showtime.show_time,
+                    "theater": {
+                        "theater_id": showtime.theater.theater_id,
+                        "theater_name": showtime.theater.theater_name,
+                        "theater_location": showtime.theater.theater_location,
+                        **({"distance_km": distances[showtime.theater_id]} if distances is not None else {}),
+                    },
+                }
+                for showtime in showtimes
+            ]))
 
         return movies_with_showtimes
@@ -3,8 +3,13 @@ from sqlalchemy.orm import Session
 import uuid
 from database import get_db  # Import the get_db function
 from datetime import datetime
-from sqlalchemy import select
+from sqlalchemy import select, insert
+from typing import List, Optional
 from functions.payment_functions import create_razorpay_order
+from utils.seat_inventory import seat_inventory
+from utils.seat_layouts import seat_layouts
+from utils.seat_holds import place_hold, confirm_hold, release_hold, held_seats, expire_holds
+from utils.seat_allocator import find_best_block, PREFERENCES
 
 def get_seatmap_by_showtime(showtime_id: int):
     """
@@ -18,49 +23,140 @@ def get_seatmap_by_showtime(showtime_id: int):
     """
     try:
         with next(get_db()) as db:
-            # Fetch all booked seats for the given showtime_id
-            booked_seats = db.execute(select(SeatMap)
-                                      .where(SeatMap.showtime_id == showtime_id)
-                                      .limit(5)
-                                      ).scalars().all()
-            
-            # Extract the booked seat numbers
-            booked_seat_nos = {seat.seat_no for seat in booked_seats}
-
-            # Define the rows and columns for the seat map
-            rows = ['A', 'B', 'C', 'D', 'E', 'F', 'G']
-            columns = range(1, 10)  # Columns 1 to 9
-
-            # Generate the complete seat map
-            seatmap = {}
-            for row in rows:
-                for col in columns:
-                    seat_no = f"{row}{col}"
-                    seatmap[seat_no] = "Booked" if seat_no in booked_seat_nos else "Available"
-
-            return seatmap
+            # Holds past their expiry free their seats now rather than at the sweeper's next pass
+            expire_holds(db, showtime_id)
+            db.commit()
+            # The whole seat map is a single integer: bit i is set when seat i of the layout is booked or held
+            bitmap = seat_inventory.get(showtime_id, db=db)
+            if bitmap is None:
+                return {"error": f"Showtime with ID {showtime_id} does not exist."}
+            layout = seat_layouts.for_showtime(showtime_id, db)
+            held = held_seats(db, showtime_id)
+
+        seatmap = {}
+        for index, seat_no in enumerate(layout.labels):
+            if seat_no in held:
+                seatmap[seat_no] = "Held"  # Someone is paying for it; it frees up again if their hold expires
+            else:
+                seatmap[seat_no] = "Booked" if bitmap >> index & 1 else "Available"
+        return seatmap
 
     except Exception as e:
         print(f"An error occurred while fetching the seat map: {e}")
         return {}
     
 
-def book_seat(email: str, showtime_id: int, seat_no: str, price: float, category: str):
+def find_best_seats(showtime_id: int, count: int, category: Optional[str] = None, preference: str = "center"):
+    """
+    Finds the best block of adjacent available seats for a group, so they can be booked together.
+
+    Args:
+    - showtime_id: The ID of the showtime.
+    - count: The number of seats wanted together.
+    - category: Optional seat category (e.g., 'Gold'); any category when omitted.
+    - preference: 'center' (default), 'front' (near the screen) or 'back'.
+
+    Returns:
+    - A dictionary with the seat numbers, their category and the total price, or an error message.
+    """
+    if preference not in PREFERENCES:
+        return {"error": f"Preference must be one of {', '.join(PREFERENCES)}."}
+
+    try:
+        with next(get_db()) as db:
+            expire_holds(db, showtime_id)
+            db.commit()
+            bitmap = seat_inventory.get(showtime_id, db=db)
+            if bitmap is None:
+                return {"error": f"Showtime with ID {showtime_id} does not exist."}
+            layout = seat_layouts.for_showtime(showtime_id, db)
+
+        if not 1 <= count <= layout.columns:
+            return {"error": f"Between 1 and {layout.columns} seats can be found together."}
+
+        seat_category = None
+        if category:
+            seat_category = layout.category_named(category)
+            if seat_category is None:
+                return {"error": f"Unknown seat category '{category}'; categories are {', '.join(c.name for c in layout.categories)}."}
+
+        # Held seats are set in the bitmap too, so they are never offered
+        block = find_best_block(layout, bitmap, count, seat_category, preference)
+        if block is None:
+            return {"error": f"No {count} adjacent seats are available{f' in {seat_category.name}' if seat_category else ''} for this showtime."}
+
+        seat_category = layout.row_categories[block[0] // layout.columns]
+        return {
+            "seats": [layout.label(index) for index in block],
+            "category": seat_category.name,
+            "price_per_seat": seat_category.price,
+            "total_price": seat_category.price * count,
+        }
+
+    except Exception as e:
+        return {"error": f"An error occurred while finding seats: {e}"}
+
+def book_seat(email: str, showtime_id: int, seat_no: str):
     """
     Books a seat for a given showtime using the user's email and handles payment via Razorpay.
+    The seat is priced from the seat layout of the showtime's screen (see get_seat_prices).
 
     Args:
     - email: The email of the user (used to identify the user).
     - showtime_id: The ID of the showtime.
     - seat_no: The seat number to book (e.g., 'A1').
-    - price: The price of the seat.
-    - category: The category of the seat (Recliner, Gold, Silver).
 
     Returns:
-    - A dictionary indicating success or failure of the booking.
+    - A dictionary indicating success or failure of the booking, with the price charged.
+    """
+    return _book_seats(email, showtime_id, [seat_no])
+
+def book_seats(email: str, showtime_id: int, seat_nos: List[str]):
     """
+    Books several seats for a given showtime in one go, with a single transaction and a single Razorpay
+    payment order for the total price. Either every seat is booked or none is.
+
+    Args:
+    - email: The email of the user (used to identify the user).
+    - showtime_id: The ID of the showtime.
+    - seat_nos: The seat numbers to book (e.g., ['C4', 'C5', 'C6']).
+
+    Returns:
+    - A dictionary indicating success or failure of the booking, with the total price.
+    """
+    if not seat_nos:
+        return {"error": "No seats were given to book."}
+    return _book_seats(email, showtime_id, seat_nos)
+
+def _book_seats(email: str, showtime_id: int, seat_nos: List[str]):
     try:
+        # Phase 1: hold the seats and record a pending transaction, in one short database transaction
         with next(get_db()) as db:
+            # Fetch the showtime details
+            showtime = db.execute(select(Showtime).where(Showtime.showtime_id == showtime_id)).scalars().first()
+            if not showtime:
+                return {"error": f"Showtime with ID {showtime_id} does not exist."}
+
+            # Fetch the movie and theater details
+            movie = db.execute(select(Movie).where(Movie.movie_id == showtime.movie_id)).scalars().first()
+            theater = db.execute(select(Theater).where(Theater.theater_id == showtime.theater_id)).scalars().first()
+
+            if not movie or not theater:
+                return {"error": "Movie or Theater details could not be found."}
+            movie_name, theater_name, show_time = movie.movie_name, theater.theater_name, showtime.show_time
+
+            # Normalize and price the seats from the showtime's layout; raises ValueError for an invalid seat
+            layout = seat_layouts.for_showtime(showtime_id, db)
+            seats = {}
+            for seat_no in seat_nos:
+                category = layout.category(seat_no)
+                seats[layout.label(layout.index(seat_no))] = (category.name, category.price)
+            seat_nos = sorted(seats, key=layout.index)
+            total_price = sum(price for _, price in seats.values())
+
+            # Holds every seat at once; raises ValueError if any of them is held by someone else or already booked
+            hold_token = place_hold(db, showtime_id, email, seat_nos)
+
             # Generate a unique transaction ID
             transaction_id = str(uuid.uuid4())
 
@@ -72,66 +168,68 @@ def book_seat(email: str, showtime_id: int, seat_no: str, price: float, category
                 transaction_time=datetime.now()
             )
             db.add(transaction)
-            db.commit()  # Commit the new transaction to capture it in case of failure
+            db.commit()  # Commit the hold and the transaction together
 
-            # Call the Razorpay payment function
-            payment_response = create_razorpay_order(price)
+        # Phase 2: call Razorpay with no database session open, so no connection waits on the network
+        payment_response = create_razorpay_order(total_price)
+
+        # Phase 3: confirm or release the hold
+        with next(get_db()) as db:
+            transaction = db.get(Transaction, transaction_id)
 
             if not payment_response["success"]:
-                # If payment fails, return an error and update the transaction
-                transaction.payment_status = False
-                db.commit()  # Update the transaction with the failed payment status
+                # If payment fails, give the seats back and return an error; the transaction stays unpaid
+                release_hold(db, hold_token)
+                db.commit()
                 return {
                     "error": "Payment failed",
                     "details": payment_response["error"]
                 }
 
+            if not confirm_hold(db, hold_token, len(seat_nos)):
+                db.rollback()
+                return {"error": f"The hold on seat(s) {', '.join(seat_nos)} expired before payment completed; please book again."}
+
             # Update transaction to reflect successful payment
             transaction.payment_status = True
-            db.commit()
-
-            # Fetch the showtime details
-            showtime = db.execute(select(Showtime).where(Showtime.showtime_id == showtime_id)).scalars().first()
-            if not showtime:
-                return {"error": f"Showtime with ID {showtime_id} does not exist."}
 
-            # Fetch the movie and theater details
-            movie = db.execute(select(Movie).where(Movie.movie_id == showtime.movie_id)).scalars().first()
-            theater = db.execute(select(Theater).where(Theater.theater_id == showtime.theater_id)).scalars().first()
-
-            if not movie or not theater:
-                return {"error": "Movie or Theater details could not be found."}
-
-            # Create a new seat entry and mark it as booked
-            seat = SeatMap(
-                showtime_id=showtime_id,
-                seat_no=seat_no,
-                seat_category=category,
-                seat_price=price,
-                seat_status=True  # Mark the seat as booked
-            )
-            db.add(seat)
-
-            # Create a new booking
-            booking = Booking(
-                user_id=email,  # Using email as the user ID
-                transaction_id=transaction_id,
-                movie_name=movie.movie_name,
-                theater=theater.theater_name,
-                show_time=showtime.show_time,
-                seat=seat_no,
-                booking_time=datetime.now()
-            )
-            db.add(booking)
+            # Mark the seats as booked and create the bookings, each in one bulk INSERT
+            booking_time = datetime.now()
+            db.execute(insert(SeatMap), [
+                {
+                    "showtime_id": showtime_id,
+                    "seat_no": seat_no,
+                    "seat_category": seats[seat_no][0],
+                    "seat_price": seats[seat_no][1],
+                    "seat_status": True,  # Mark the seat as booked
+                }
+                for seat_no in seat_nos
+            ])
+            db.execute(insert(Booking), [
+                {
+                    "user_id": email,  # Using email as the user ID
+                    "transaction_id": transaction_id,
+                    "movie_name": movie_name,
+                    "theater": theater_name,
+                    "show_time": show_time,
+                    "seat": seat_no,
+                    "booking_time": booking_time,
+                }
+                for seat_no in seat_nos
+            ])
 
             # Commit the changes to the database
             db.commit()
 
+            label = f"Seat {seat_nos[0]}" if len(seat_nos) == 1 else f"Seats {', '.join(seat_nos)}"
             return {
-                "success": f"Seat {seat_no} successfully booked for {movie.movie_name} at {theater.theater_name} on {showtime.show_time}.",
+                "success": f"{label} successfully booked for {movie_name} at {theater_name} on {show_time}.",
+                "total_price": total_price,
                 "payment_order": payment_response["order"]  # Include Razorpay order details in the response
             }
 
+    except ValueError as e:
+        return {"error": str(e)}
     except Exception as e:
         return {"error": f"An error occurred while booking the seat: {e}"}
     
@@ -169,6 +267,7 @@ def cancel_booking(email: str, seat_no: str, showtime_id: int):
                               ).scalars().first()
             if seat:
                 seat.seat_status = False  # Mark the seat as available
+            seat_inventory.release(showtime_id, seat_layouts.for_showtime(showtime_id, db).mask([seat_no]), db)
 
             # Delete the booking entry
             db.delete(booking)
@@ -228,18 +327,32 @@ def check_booking_by_email(email: str):
     except Exception as e:
         return {"error": f"An error occurred while fetching bookings: {e}"}
 
-def get_seat_prices(seat_no: str):
+def get_seat_prices(showtime_id: int, seat_no: Optional[str] = None):
     """
-    Returns the price of a given seat based on its seat number and category.
+    Returns the seat categories and prices of a showtime's screen, or the category and price of one seat.
 
     Args:
-    - seat_no: The seat number (e.g., 'A1').
+    - showtime_id: The ID of the showtime.
+    - seat_no: Optional seat number (e.g., 'A1') to price a single seat.
 
     Returns:
-    - The price of the seat.
+    - A dictionary with the seat's category and price, or every category with its rows and price.
     """
-    return """
-    if the seat_no starts with 'A' or 'B': it is a Recliner seat with price 700
-    if the seat_no starts with 'C' or 'D': it is a Gold seat with price 500
-    if the seat_no starts with 'E' or 'F' or 'G': it is a Silver seat with price 300
-    """
\ No newline at end of file
+    try:
+        layout = seat_layouts.for_showtime(showtime_id)
+        if layout is None:
+            return {"error": f"Showtime with ID {showtime_id} does not exist."}
+
+        if seat_no is not None:
+            category = layout.category(seat_no)
+            return {"seat_no": layout.label(layout.index(seat_no)), "category": category.name, "price": category.price}
+
+        return {
+            "categories": [
+                {"category": category.name, "rows": list(category.rows), "price": category.price}
+                for category in layout.categories
+            ]
+        }
+
+    except ValueError as e:
+        return {"error": str(e)}
@@ -1,28 +1,61 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, func, or_, and_
 from database import get_db  # Import the get_db function
 from schemas.models import Theater, Showtime , Movie # SQLAlchemy model
-from datetime import datetime
-from math import radians, sin, cos, sqrt, atan2
+from utils.movie_index import movie_text_index
+from utils.pagination import paginate_query, paginate_sorted, paginate_ranked
+from utils.theater_index import theater_index, theater_to_dict, theaters_within, nearest_theaters, nearby_condition, THEATER_GEO_BACKEND
+from utils.now_showing import parse_show_time
+from utils.theater_schedule import theater_schedule, showtime_to_dict
+from utils.locations import location_directory
+from utils.suburb_distances import suburb_distances
+from utils.geo import haversine_matrix
+from datetime import datetime, timedelta
+from typing import Optional
 
-def get_theaters_by_location(location: str):
+def _paginate_theaters(db, query, cursor=None, limit: int = 10):
+    """
+    Keyset-paginates a SELECT of Theater rows by theater_id.
+    """
+    return paginate_query(
+        db,
+        query,
+        [(Theater.theater_id, False)],
+        cursor=cursor,
+        limit=limit,
+        row_key=lambda row: (row.Theater.theater_id,),
+        to_dict=lambda row: theater_to_dict(row.Theater),
+    )
+
+def get_theaters_by_location(location: str, cursor: Optional[str] = None, limit: int = 10):
     """
     Fetches theaters by a specific location.
 
     Args:
-    - location: The location (city, area, etc.) to search theaters by.
+    - location: The location (suburb, area, etc.) to search theaters by. Case, common alternative names
+      (e.g. "Andheri West") and small typos are tolerated.
+    - cursor: Optional `next_cursor` from a previous call, to fetch the next page of results.
+    - limit: Number of theaters per page (default is 10).
 
     Returns:
-    - List of theaters that match the specified location, unmarshalled into a dictionary.
+    - A dictionary with `results`, the theaters that match the specified location unmarshalled into a dictionary,
+      and `next_cursor`, to pass back for more results (None when there are no more).
+      Returns an error if the location is not known.
     """
+    # Aliases and spelling are resolved in memory; the database only sees an indexed integer filter
+    location_id = location_directory.resolve(location)
+    if location_id is None:
+        return {"error": f"Location '{location}' not found."}
+
     with next(get_db()) as db:
-        results = db.execute(
-            select(Theater).where(Theater.theater_location == location).limit(10)
-        ).scalars().all()
-        
-        return [theater.__dict__ for theater in results]
+        query = select(Theater).where(or_(
+            Theater.location_id == location_id,
+            # Theaters not linked to a location yet (see dataDump/theaters.py) still match on their free-text location
+            and_(Theater.location_id.is_(None), Theater.theater_location.in_({location, location_directory.name(location_id)})),
+        ))
+        return _paginate_theaters(db, query, cursor=cursor, limit=limit)
 
-def get_nearby_theaters(user_lat: float, user_lon: float, radius_km: float = 10):
+def get_nearby_theaters(user_lat: float, user_lon: float, radius_km: float = 10, cursor: Optional[str] = None, limit: int = 10):
     """
     Fetches theaters within a given radius from the user's location.
 
@@ -30,60 +63,234 @@ def get_nearby_theaters(user_lat: float, user_lon: float, radius_km: float = 10)
     - user_lat: Latitude of the user's location.
     - user_lon: Longitude of the user's location.
     - radius_km: Radius in kilometers to search for theaters (default is 10 km).
+    - cursor: Optional `next_cursor` from a previous call, to fetch the next page of results.
+    - limit: Number of theaters per page (default is 10).
 
     Returns:
-    - List of nearby theaters within the radius, unmarshalled into a dictionary.
+    - A dictionary with `results`, the nearby theaters within the radius (nearest first, with `distance_km`)
+      unmarshalled into a dictionary, and `next_cursor`, to pass back for more results (None when there are no more).
     """
-    def haversine(lat1, lon1, lat2, lon2):
-        R = 6371  # Radius of Earth in kilometers
-        dlat = radians(lat2 - lat1)
-        dlon = radians(lon2 - lon1)
-        a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-        return R * c
+    # Answered from the spatial index (or an index-backed SQL bounding box), never by scanning every theater
+    return paginate_sorted(
+        theaters_within(user_lat, user_lon, radius_km),
+        lambda theater: (theater["distance_km"], theater["theater_id"]),
+        cursor=cursor,
+        limit=limit,
+    )
 
-    with next(get_db()) as db:
-        theaters = db.execute(select(Theater).where(Theater.latitude.isnot(None), Theater.longitude.isnot(None)).limit(10)).scalars().all()
-        nearby_theaters = []
+def get_theaters_near_suburb(suburb: str, cursor: Optional[str] = None, limit: int = 10):
+    """
+    Fetches theaters ranked by distance from a suburb the user names (e.g. "Andheri"), without needing coordinates.
+
+    Args:
+    - suburb: The suburb or area name. Case, common alternative names and small typos are tolerated.
+    - cursor: Optional `next_cursor` from a previous call, to fetch the next page of results.
+    - limit: Number of theaters per page (default is 10).
+
+    Returns:
+    - A dictionary with `results`, the theaters nearest the suburb first unmarshalled into a dictionary, each with
+      its `suburb` and the suburb-to-suburb `distance_km`, and `next_cursor`, to pass back for more results
+      (None when there are no more). Returns an error if the suburb is not known.
+    """
+    location_id = location_directory.resolve(suburb)
+    if location_id is None:
+        return {"error": f"Location '{suburb}' not found."}
+
+    # The theaters were ranked by distance from every suburb offline; a page is a seek into that ranking
+    ranking = suburb_distances.theaters_near(location_id)
+    if ranking is None:
+        return {"error": f"The distances from '{location_directory.name(location_id)}' are not known yet."}
+
+    response = paginate_ranked(ranking, lambda ranked: (ranked.distance_km, ranked.theater_id), cursor=cursor, limit=limit)
+    if "error" in response:
+        return response
+
+    theaters = {ranked.theater_id: None for ranked in response["results"]}
+    if THEATER_GEO_BACKEND == "memory":
+        theater_index.ensure_loaded()
+        theaters.update((theater_id, theater_index.theaters.get(theater_id)) for theater_id in theaters)
+    # The page's theaters that aren't in the geo index (theaters without coordinates are ranked by their suburb
+    # alone), or all of them with a database geo backend, are fetched in one query
+    missing = [theater_id for theater_id, theater in theaters.items() if theater is None]
+    if missing:
+        with next(get_db()) as db:
+            for theater in db.execute(select(Theater).where(Theater.theater_id.in_(missing))).scalars():
+                theaters[theater.theater_id] = theater_to_dict(theater)
+
+    response["results"] = [
+        dict(theaters[ranked.theater_id], suburb=location_directory.name(ranked.location_id), distance_km=ranked.distance_km)
+        for ranked in response["results"]
+        if theaters[ranked.theater_id] is not None  # Removed since the ranking was built
+    ]
+    return response
 
-        for theater in theaters:
-            distance = haversine(user_lat, user_lon, theater.latitude, theater.longitude)
-            if distance <= radius_km:
-                nearby_theaters.append(theater.__dict__)
+def get_nearest_theaters(user_lat: float, user_lon: float, k: int = 5):
+    """
+    Fetches the theaters closest to the user's location, however far away they are.
+
+    Args:
+    - user_lat: Latitude of the user's location.
+    - user_lon: Longitude of the user's location.
+    - k: Number of theaters to return (default is 5).
 
-        return nearby_theaters
+    Returns:
+    - List of the k nearest theaters (nearest first, with `distance_km`), unmarshalled into a dictionary.
+    """
+    return nearest_theaters(user_lat, user_lon, k)
     
-def get_accessible_theaters():
+def get_accessible_theaters(cursor: Optional[str] = None, limit: int = 10):
     """
-    Fetches theaters that are accessible.
+    Fetches theaters that are accessible, in no particular order. Prefer get_accessible_theaters_near_location
+    when the user's location is known.
+
+    Args:
+    - cursor: Optional `next_cursor` from a previous call, to fetch the next page of results.
+    - limit: Number of theaters per page (default is 10).
 
     Returns:
-    - List of accessible theaters, unmarshalled into a dictionary.
+    - A dictionary with `results`, the accessible theaters unmarshalled into a dictionary, and `next_cursor`,
+      to pass back for more results (None when there are no more).
     """
     with next(get_db()) as db:
-        results = db.execute(
-            select(Theater).where(Theater.accessibility == True).limit(10)
-        ).scalars().all()
-        
-        return [theater.__dict__ for theater in results]
+        query = select(Theater).where(Theater.accessibility == True)
+        return _paginate_theaters(db, query, cursor=cursor, limit=limit)
     
 
-def get_showtimes_by_theater(theater_id: str):
+def get_accessible_theaters_near_location(
+    user_lat: float,
+    user_lon: float,
+    limit: int = 5,
+    movie_name: Optional[str] = None,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    max_showtimes: int = 5,
+):
+    """
+    Fetches the accessible (wheelchair friendly) theaters closest to the user's location, optionally only those
+    showing a specific movie within a time range.
+
+    Args:
+    - user_lat: Latitude of the user's location.
+    - user_lon: Longitude of the user's location.
+    - limit: Number of theaters to return (default is 5).
+    - movie_name: Optional name of a movie the theater must be showing (case-insensitive, typos are tolerated).
+    - start_time: Optional start of the time range in 'YYYY-MM-DD HH:MM:SS' format (default is now); used with movie_name.
+    - end_time: Optional end of the time range in 'YYYY-MM-DD HH:MM:SS' format (default is 24 hours after
+      start_time); used with movie_name.
+    - max_showtimes: Maximum number of showtimes listed per theater, earliest first (default is 5).
+
+    Returns:
+    - List of the nearest accessible theaters (nearest first, with `distance_km`) unmarshalled into a dictionary.
+      When a movie is given, each theater also lists the matching `showtimes` and the resolved `movie_name`.
+    """
+    if movie_name is None:
+        # The accessible-only spatial index (or the partial indexes on accessible theaters) makes this exactly
+        # as cheap as an unfiltered nearest search
+        return nearest_theaters(user_lat, user_lon, limit, accessible_only=True)
+
+    try:
+        start = parse_show_time(start_time) if start_time else datetime.now()
+        end = parse_show_time(end_time) if end_time else start + timedelta(days=1)
+    except ValueError:
+        return {"error": "start_time and end_time must be in 'YYYY-MM-DD HH:MM:SS' format."}
+    if end < start:
+        return {"error": "end_time must not be before start_time."}
+
+    candidates = movie_text_index.resolve_name(movie_name, limit=1)
+    if not candidates:
+        return []
+    movie = candidates[0]
+
+    with next(get_db()) as db:
+        # One query (ix_showtimes_movie_id_show_time) for the showtimes of the movie in the window at accessible
+        # theaters, numbered per theater so only the first max_showtimes of each leave the database
+        ranked = (
+            select(
+                Showtime.theater_id,
+                Showtime.showtime_id,
+                Showtime.show_time,
+                func.row_number().over(
+                    partition_by=Showtime.theater_id, order_by=(Showtime.show_time, Showtime.showtime_id)
+                ).label("theater_rank"),
+            )
+            .join(Theater, Theater.theater_id == Showtime.theater_id)
+            .where(
+                Showtime.movie_id == movie["movie_id"],
+                Showtime.show_time >= start,
+                Showtime.show_time <= end,
+                Theater.accessibility == True,
+            )
+            .subquery()
+        )
+        query = (
+            select(ranked.c.theater_id, ranked.c.showtime_id, ranked.c.show_time)
+            .where(ranked.c.theater_rank <= max_showtimes)
+            .order_by(ranked.c.show_time, ranked.c.showtime_id)
+        )
+        showtimes = {}
+        for theater_id, showtime_id, show_time in db.execute(query).all():
+            showtimes.setdefault(theater_id, []).append({"showtime_id": showtime_id, "show_time": show_time})
+        if not showtimes:
+            return []
+
+        theaters = nearest_theaters(
+            user_lat, user_lon, limit, db, accessible_only=True, where=lambda theater: theater["theater_id"] in showtimes
+        )
+    return [
+        dict(theater, movie_name=movie["movie_name"], showtimes=showtimes[theater["theater_id"]])
+        for theater in theaters
+    ]
+    
+
+def get_showtimes_by_theater(
+    theater_id: str,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 10,
+):
     """
     Fetches showtimes for a specific theater.
 
     Args:
     - theater_id: The ID of the theater to fetch showtimes for.
+    - start_time: Optional start of the time range in 'YYYY-MM-DD HH:MM:SS' format (default is now).
+    - end_time: Optional end of the time range in 'YYYY-MM-DD HH:MM:SS' format.
+    - cursor: Optional `next_cursor` from a previous call, to fetch the next page of results.
+    - limit: Number of showtimes per page (default is 10).
 
     Returns:
-    - List of showtimes for the given theater, unmarshalled into a dictionary.
+    - A dictionary with `results`, the showtimes for the given theater in chronological order unmarshalled into
+      a dictionary, and `next_cursor`, to pass back for more results (None when there are no more).
     """
+    try:
+        start = parse_show_time(start_time) if start_time else datetime.now()
+        end = parse_show_time(end_time) if end_time else None
+    except ValueError:
+        return {"error": "start_time and end_time must be in 'YYYY-MM-DD HH:MM:SS' format."}
+
+    if theater_schedule.covers(start):
+        # Upcoming showtimes are a bisect into the theater's in-memory timeline
+        return paginate_sorted(
+            theater_schedule.between(theater_id, start, end),
+            lambda showtime: (showtime["show_time"].isoformat(), showtime["showtime_id"]),
+            cursor=cursor,
+            limit=limit,
+        )
+
     with next(get_db()) as db:
-        results = db.execute(
-            select(Showtime).where(Showtime.theater_id == theater_id).limit(10)
-        ).scalars().all()
-        
-        return [showtime.__dict__ for showtime in results]
+        query = select(Showtime).where(Showtime.theater_id == theater_id, Showtime.show_time >= start)
+        if end is not None:
+            query = query.where(Showtime.show_time <= end)
+        return paginate_query(
+            db,
+            query,
+            [(Showtime.show_time, False), (Showtime.showtime_id, False)],
+            cursor=cursor,
+            limit=limit,
+            row_key=lambda row: (row.Showtime.show_time, row.Showtime.showtime_id),
+            to_dict=lambda row: showtime_to_dict(row.Showtime),
+        )
     
 
 def get_movie_showtimes_near_location(movie_name: str, user_lat: float, user_lon: float, start_time: str, end_time: str, radius_km: float = 10):
@@ -91,7 +298,7 @@ def get_movie_showtimes_near_location(movie_name: str, user_lat: float, user_lon
     Fetches showtimes for a specific movie near a location and within a specific time range.
 
     Args:
-    - movie_name: The name of the movie to search for.
+    - movie_name: The name of the movie to search for (case-insensitive, typos are tolerated).
     - user_lat: Latitude of the user's location.
     - user_lon: Longitude of the user's location.
     - start_time: The start of the time range in 'YYYY-MM-DD HH:MM:SS' format.
@@ -99,47 +306,83 @@ def get_movie_showtimes_near_location(movie_name: str, user_lat: float, user_lon
     - radius_km: Radius in kilometers to search for theaters (default is 10 km).
 
     Returns:
-    - List of showtimes for the given movie near the location and within the time range.
+    - List of showtimes for the best matching movie near the location and within the time range, in chronological
+      order. Each showtime includes the resolved `movie_name`, the `theater_name`, `theater_location` and `distance_km`.
     """
-    # Get nearby theaters
-    nearby_theaters = get_nearby_theaters(user_lat, user_lon, radius_km)
-    nearby_theater_ids = [theater['theater_id'] for theater in nearby_theaters]
+    try:
+        start, end = parse_show_time(start_time), parse_show_time(end_time)
+    except ValueError:
+        return {"error": "start_time and end_time must be in 'YYYY-MM-DD HH:MM:SS' format."}
 
-    if not nearby_theater_ids:
+    # Resolve the movie name in memory (case and typo tolerant) instead of an exact-match query
+    candidates = movie_text_index.resolve_name(movie_name, limit=1)
+    if not candidates:
         return []
+    movie = candidates[0]
 
-    with next(get_db()) as db:
-        # Find the movie by name
-        movie = db.execute(
-            select(Movie).where(Movie.movie_name == movie_name).limit(20)
-        ).scalars().first()
+    query = (
+        select(Showtime, Theater.theater_name, Theater.theater_location, Theater.latitude, Theater.longitude)
+        .join(Theater, Theater.theater_id == Showtime.theater_id)
+        .where(Showtime.movie_id == movie["movie_id"], Showtime.show_time >= start, Showtime.show_time <= end)
+        .order_by(Showtime.show_time, Showtime.showtime_id)
+    )
+    if THEATER_GEO_BACKEND == "memory":
+        # Nearby theaters come from the in-process spatial index, so the database is only asked for showtimes
+        nearby = {theater["theater_id"]: theater["distance_km"] for theater in theater_index.within(user_lat, user_lon, radius_km)}
+        if not nearby:
+            return []
+        query = query.where(Showtime.theater_id.in_(list(nearby)))
+    else:
+        # The bounding box is pushed into the same query; the exact distance is checked below
+        query = query.where(nearby_condition(user_lat, user_lon, radius_km))
 
-        if not movie:
+    # One session and one round trip: movie, time window and location are resolved together
+    with next(get_db()) as db:
+        rows = db.execute(query).all()
+        if not rows:
             return []
 
-        # Query showtimes for the movie in nearby theaters within the time range
-        results = db.execute(
-            select(Showtime)
-            .where(
-                Showtime.movie_id == movie.movie_id,
-                Showtime.theater_id.in_(nearby_theater_ids),
-                Showtime.show_time >= start_time,
-                Showtime.show_time <= end_time
+        if THEATER_GEO_BACKEND == "memory":
+            distances = [nearby[row.Showtime.theater_id] for row in rows]
+        else:
+            distances = haversine_matrix([user_lat], [user_lon], [row.latitude for row in rows], [row.longitude for row in rows])[0]
+            distances = [round(float(distance), 3) for distance in distances]
+
+        return [
+            dict(
+                showtime_to_dict(row.Showtime),
+                movie_name=movie["movie_name"],
+                theater_name=row.theater_name,
+                theater_location=row.theater_location,
+                distance_km=distance,
             )
-        ).scalars().all()
-        
-        return [showtime.__dict__ for showtime in results]
+            for row, distance in zip(rows, distances)
+            if distance <= radius_km
+        ]
     
-def get_showtimes_by_theater_name(theater_name: str):
+def get_showtimes_by_theater_name(theater_name: str, start_time: str, end_time: str, cursor: Optional[str] = None, limit: int = 20):
     """
-    Fetches all showtimes for a specific theater by its name.
+    Fetches the showtimes of a specific theater, by its name, within a time range.
 
     Args:
     - theater_name: The name of the theater to search for.
+    - start_time: The start of the time range in 'YYYY-MM-DD HH:MM:SS' format.
+    - end_time: The end of the time range in 'YYYY-MM-DD HH:MM:SS' format.
+    - cursor: Optional `next_cursor` from a previous call with the same range, to fetch the next page of showtimes.
+    - limit: Number of showtimes per page (default is 20).
 
     Returns:
-    - List of showtimes for the given theater, or an empty list if no theater is found.
+    - A dictionary with the `theater`, its showtimes in the range grouped by day and then by movie under `days`,
+      and `next_cursor`, to pass back for more showtimes (None when there are no more).
+      Returns an error if no theater is found.
     """
+    try:
+        start, end = parse_show_time(start_time), parse_show_time(end_time)
+    except ValueError:
+        return {"error": "start_time and end_time must be in 'YYYY-MM-DD HH:MM:SS' format."}
+    if end < start:
+        return {"error": "end_time must not be before start_time."}
+
     with next(get_db()) as db:
         # Find the theater by name
         theater = db.execute(
@@ -148,14 +391,38 @@ def get_showtimes_by_theater_name(theater_name: str):
 
         if not theater:
             return {"error": f"Theater with name '{theater_name}' not found."}
+        theater = theater_to_dict(theater)
+
+    # Served from the in-memory timeline, or an index range scan on (theater_id, show_time) for past windows
+    showtimes = get_showtimes_by_theater(theater["theater_id"], start_time, end_time, cursor=cursor, limit=limit)
+    if "error" in showtimes:
+        return showtimes
 
-        # Fetch showtimes for the theater
-        showtimes = db.execute(
-            select(Showtime).where(Showtime.theater_id == theater.theater_id)
-        ).scalars().all()
+    return {
+        "theater": theater,
+        "days": _group_by_day_and_movie(showtimes["results"]),
+        "next_cursor": showtimes["next_cursor"],
+    }
+
+def _group_by_day_and_movie(showtimes):
+    """
+    Groups chronologically ordered showtimes into [{date, movies: [{movie_id, movie_name, showtimes}]}].
+    """
+    movie_text_index.ensure_loaded()
+    days = {}
+    for showtime in showtimes:
+        movies = days.setdefault(showtime["show_time"].date().isoformat(), {})
+        if showtime["movie_id"] not in movies:
+            movie = movie_text_index.movies.get(showtime["movie_id"], {})
+            movies[showtime["movie_id"]] = {
+                "movie_id": showtime["movie_id"],
+                "movie_name": movie.get("movie_name"),
+                "showtimes": [],
+            }
+        movies[showtime["movie_id"]]["showtimes"].append({
+            "showtime_id": showtime["showtime_id"],
+            "time": showtime["show_time"].strftime("%H:%M"),
+            "language": showtime["language"],
+        })
 
-        # Convert showtimes to dictionary format
-        return {
-            "theater": theater.__dict__,
-            "showtimes": [showtime.__dict__ for showtime in showtimes]
-        }
\ No newline at end of file
+    return [{"date": date, "movies": list(movies.values())} for date, movies in days.items()]
@@ -16,17 +16,17 @@ from system_prompt import prompt
 from functions.movie_functions import (
     get_movies_by_name,
     get_movies_by_description,
-    get_movies_by_genre,
-    get_movies_by_cast,
-    get_movies_by_language,
-    get_movies_by_mood,
-    get_movies_by_average_rating,
-    get_movies_by_showtime,
+    search_movies,
+    get_movies_by_semantic_query,
+    get_movies_by_name_with_showtimes_and_theatres,
 )
 from functions.payment_functions import create_razorpay_order
 from functions.theater_functions import (
     get_nearby_theaters,
+    get_nearest_theaters,
+    get_theaters_near_suburb,
     get_accessible_theaters,
+    get_accessible_theaters_near_location,
     get_movie_showtimes_near_location,
     get_showtimes_by_theater_name,
     get_theaters_by_location,
@@ -34,10 +34,23 @@ from functions.theater_functions import (
 from functions.seatmap import (
     get_seatmap_by_showtime,
     book_seat,
+    book_seats,
+    find_best_seats,
     cancel_booking,
     check_booking_by_email,
     get_seat_prices,
 )
+from utils.movie_index import movie_text_index
+from utils.semantic_index import semantic_index
+from utils.facet_rankings import facet_rankings
+from utils.now_showing import now_showing
+from utils.theater_index import theater_index, accessible_theater_index
+from utils.theater_schedule import theater_schedule
+from utils.locations import location_directory
+from utils.suburb_distances import suburb_distances
+from utils.seat_layouts import seat_layouts
+from utils.catalog_cache import start_invalidation_listener, get_catalog_cache_stats
+from utils.seat_holds import start_hold_sweeper
 
 # Load environment variables
 load_dotenv()
@@ -51,6 +64,26 @@ if not openai_api_key:
 # Settings for LlamaIndex
 Settings.llm = OpenAI(model="gpt-4o", temperature=0.7, api_key=openai_api_key, system_prompt="")
 
+# Build the in-memory search indexes once per server process (Streamlit reruns this script on every interaction)
+@st.cache_resource
+def load_search_indexes():
+    movie_text_index.load()
+    semantic_index.load()
+    facet_rankings.load()
+    now_showing.load()
+    theater_index.load()
+    accessible_theater_index.load()
+    theater_schedule.load()
+    location_directory.load()
+    suburb_distances.load()
+    seat_layouts.load()
+    # Drop cached catalog rows whenever the data scripts NOTIFY a movie or review change
+    start_invalidation_listener()
+    # Release seats whose holds expired without a confirmed payment
+    start_hold_sweeper()
+
+load_search_indexes()
+
 # System prompt setup
 system_prompt = prompt
 react_system_prompt = PromptTemplate(system_prompt)
@@ -58,20 +91,23 @@ react_system_prompt = PromptTemplate(system_prompt)
 # Define tools
 get_movies_by_name_tool = FunctionTool.from_defaults(fn=get_movies_by_name)
 get_movies_by_description_tool = FunctionTool.from_defaults(fn=get_movies_by_description)
-get_movies_by_genre_tool = FunctionTool.from_defaults(fn=get_movies_by_genre)
-get_movies_by_cast_tool = FunctionTool.from_defaults(fn=get_movies_by_cast)
-get_movies_by_language_tool = FunctionTool.from_defaults(fn=get_movies_by_language)
-get_movies_by_mood_tool = FunctionTool.from_defaults(fn=get_movies_by_mood)
-get_movies_by_average_rating_tool = FunctionTool.from_defaults(fn=get_movies_by_average_rating)
-get_movies_by_showtime_tool = FunctionTool.from_defaults(fn=get_movies_by_showtime)
+# search_movies covers the genre, cast, language, mood, rating and showtime filters in a single call
+search_movies_tool = FunctionTool.from_defaults(fn=search_movies)
+get_movies_by_semantic_query_tool = FunctionTool.from_defaults(fn=get_movies_by_semantic_query)
+get_movies_by_name_with_showtimes_and_theatres_tool = FunctionTool.from_defaults(fn=get_movies_by_name_with_showtimes_and_theatres)
 create_razorpay_order_tool = FunctionTool.from_defaults(fn=create_razorpay_order)
 get_nearby_theaters_tool = FunctionTool.from_defaults(fn=get_nearby_theaters)
+get_nearest_theaters_tool = FunctionTool.from_defaults(fn=get_nearest_theaters)
+get_theaters_near_suburb_tool = FunctionTool.from_defaults(fn=get_theaters_near_suburb)
 get_accessible_theaters_tool = FunctionTool.from_defaults(fn=get_accessible_theaters)
+get_accessible_theaters_near_location_tool = FunctionTool.from_defaults(fn=get_accessible_theaters_near_location)
 get_movie_showtimes_near_location_tool = FunctionTool.from_defaults(fn=get_movie_showtimes_near_location)
 get_showtimes_by_theater_name_tool = FunctionTool.from_defaults(fn=get_showtimes_by_theater_name)
 get_theaters_by_location_tool = FunctionTool.from_defaults(fn=get_theaters_by_location)
 get_seatmap_by_showtime_tool = FunctionTool.from_defaults(fn=get_seatmap_by_showtime)
 book_seat_tool = FunctionTool.from_defaults(fn=book_seat)
+book_seats_tool = FunctionTool.from_defaults(fn=book_seats)
+find_best_seats_tool = FunctionTool.from_defaults(fn=find_best_seats)
 cancel_booking_tool = FunctionTool.from_defaults(fn=cancel_booking)
 check_booking_by_email_tool = FunctionTool.from_defaults(fn=check_booking_by_email)
 get_seat_prices_tool = FunctionTool.from_defaults(fn=get_seat_prices)
@@ -81,20 +117,22 @@ agent = ReActAgent.from_tools(
     [
         get_movies_by_name_tool,
         get_movies_by_description_tool,
-        get_movies_by_genre_tool,
-        get_movies_by_cast_tool,
-        get_movies_by_language_tool,
-        get_movies_by_mood_tool,
-        get_movies_by_average_rating_tool,
-        get_movies_by_showtime_tool,
+        search_movies_tool,
+        get_movies_by_semantic_query_tool,
+        get_movies_by_name_with_showtimes_and_theatres_tool,
         create_razorpay_order_tool,
         get_nearby_theaters_tool,
+        get_nearest_theaters_tool,
+        get_theaters_near_suburb_tool,
         get_accessible_theaters_tool,
+        get_accessible_theaters_near_location_tool,
         get_movie_showtimes_near_location_tool,
         get_showtimes_by_theater_name_tool,
         get_theaters_by_location_tool,
         get_seatmap_by_showtime_tool,
         book_seat_tool,
+        book_seats_tool,
+        find_best_seats_tool,
         cancel_booking_tool,
         check_booking_by_email_tool,
         get_seat_prices_tool,
@@ -122,6 +160,9 @@ st.sidebar.markdown(
     """
 )
 
+with st.sidebar.expander("Catalog cache"):
+    st.json(get_catalog_cache_stats())
+
 # Main Chat Interface
 st.subheader("Chat with the Assistant")
 
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Boolean, DateTime, ForeignKey, Computed, Index, UniqueConstraint, JSON
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 
 Base = declarative_base()
@@ -33,11 +34,18 @@ class Movie(Base):
     movie_id = Column(Integer, primary_key=True, autoincrement=False)
     movie_name = Column(String, nullable=False)
     movie_description = Column(String, nullable=False)
-    genre = Column(String, nullable=False)
+    genre = Column(String, nullable=False, index=True)
     cast = Column(String, nullable=False)
-    language = Column(String, nullable=False)
-    mood = Column(String, nullable=False)
-    average_rating = Column(Float, nullable=False)
+    language = Column(String, nullable=False, index=True)
+    mood = Column(String, nullable=False, index=True)
+    average_rating = Column(Float, nullable=False, index=True)
+    # Generated full-text document (GIN indexed), only loaded when queried explicitly
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english', coalesce(movie_name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(\"cast\", '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(movie_description, '')), 'C')",
+        persisted=True,
+    )))
 
     # Relationship
     showtimes = relationship("Showtime", back_populates="movie")
@@ -65,11 +73,42 @@ class Showtime(Base):
     movie_id = Column(Integer, ForeignKey('movies.movie_id'), nullable=False)
     language = Column(String, nullable=False)
     show_time = Column(DateTime, nullable=False)
+    seat_bitmap = Column(BigInteger, nullable=False, default=0, server_default='0')  # Bit i set = seat i of the layout booked
+    layout_id = Column(Integer, ForeignKey('seat_layouts.layout_id'), nullable=True)  # None = the default seat layout
 
     # Relationships
     theater = relationship("Theater", back_populates="showtimes")
     movie = relationship("Movie", back_populates="showtimes")
     seatmap = relationship("SeatMap", back_populates="showtime")
+    layout = relationship("SeatLayout")
+
+    __table_args__ = (
+        Index('ix_showtimes_movie_id_show_time', 'movie_id', 'show_time'),
+        Index('ix_showtimes_theater_id_show_time', 'theater_id', 'show_time'),
+    )
+
+
+class Location(Base):
+    __tablename__ = 'locations'
+
+    location_id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, nullable=False, unique=True)  # Display name, e.g. "Vile Parle"
+    name_key = Column(String, nullable=False, unique=True, index=True)  # Case-folded name, e.g. "vile parle"
+    latitude = Column(Float, nullable=True)  # Centre of the location, used when none of its theaters is geocoded
+    longitude = Column(Float, nullable=True)
+
+    # Relationships
+    aliases = relationship("LocationAlias", back_populates="location")
+    theaters = relationship("Theater", back_populates="location")
+
+class LocationAlias(Base):
+    __tablename__ = 'location_aliases'
+
+    alias_key = Column(String, primary_key=True)  # Case-folded alternative name, e.g. "andheri west"
+    location_id = Column(Integer, ForeignKey('locations.location_id'), nullable=False, index=True)
+
+    # Relationship
+    location = relationship("Location", back_populates="aliases")
 
 
 class Theater(Base):
@@ -77,12 +116,20 @@ class Theater(Base):
     theater_id = Column(String, primary_key=True)  # UUID as a string
     theater_name = Column(String, nullable=False)
     theater_location = Column(String, nullable=False)
+    location_id = Column(Integer, ForeignKey('locations.location_id'), nullable=True, index=True)  # Normalized location
     latitude = Column(Float, nullable=True)  # New column for latitude
     longitude = Column(Float, nullable=True)  # New column for longitude
     accessibility = Column(Boolean, nullable=True)  # New column for accessibility
 
 
     showtimes = relationship("Showtime", back_populates="theater")
+    location = relationship("Location", back_populates="theaters")
+
+    __table_args__ = (
+        Index('ix_theaters_latitude_longitude', 'latitude', 'longitude'),
+        # Partial index for the accessible-only nearby search
+        Index('ix_theaters_accessible_latitude_longitude', 'latitude', 'longitude', postgresql_where=accessibility == True),
+    )
 
 # Transaction Table
 class Transaction(Base):
@@ -111,4 +158,38 @@ class Booking(Base):
     booking_time = Column(DateTime, default=datetime.now(), nullable=False)  # Booking timestamp
 
     # Relationship to transaction
-    transaction = relationship("Transaction", back_populates="bookings")
\ No newline at end of file
+    transaction = relationship("Transaction", back_populates="bookings")
+
+
+# Seat Holds Table
+class SeatHold(Base):
+    __tablename__ = 'seat_holds'
+
+    hold_id = Column(Integer, primary_key=True, autoincrement=True)
+    hold_token = Column(String, nullable=False, index=True)  # UUID shared by the seats held together
+    showtime_id = Column(Integer, ForeignKey('showtimes.showtime_id'), nullable=False)
+    seat_no = Column(String, nullable=False)  # Seat number (e.g., A1, B5)
+    user_id = Column(String, nullable=False)  # User holding the seat
+    expires_at = Column(DateTime, nullable=False, index=True)  # Hold is released by the sweeper after this
+
+    __table_args__ = (
+        # At most one hold per seat: a second concurrent hold fails on this constraint
+        UniqueConstraint('showtime_id', 'seat_no', name='uq_seat_holds_showtime_id_seat_no'),
+    )
+
+
+# Seat Layouts Table
+class SeatLayout(Base):
+    __tablename__ = 'seat_layouts'
+
+    layout_id = Column(Integer, primary_key=True, autoincrement=True)
+    theater_id = Column(String, ForeignKey('theaters.theater_id'), nullable=True)  # None for the shared default layout
+    screen = Column(String, nullable=False)  # Screen name (e.g., Screen 1)
+    rows = Column(String, nullable=False)  # Row letters, starting with the row nearest the screen (e.g., ABCDEFG)
+    columns = Column(Integer, nullable=False)  # Seats per row, numbered from 1
+    gaps = Column(JSON, nullable=False, default=list)  # Aisles: seat numbers followed by a gap (e.g., [3, 7])
+    categories = Column(JSON, nullable=False)  # E.g., [{"name": "Gold", "rows": "CD", "price": 500}, ...]
+
+    __table_args__ = (
+        UniqueConstraint('theater_id', 'screen', name='uq_seat_layouts_theater_id_screen'),
+    )
\ No newline at end of file
@@ -0,0 +1,177 @@
+import os
+import copy
+import time
+import select
+import threading
+from collections import OrderedDict
+from functools import wraps
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+from database import engine
+from schemas.models import Movie, Showtime  # SQLAlchemy model
+from utils.model_events import subscribe
+
+# Postgres NOTIFY channel used by the data scripts (dataDump/catalog_notify.py) to announce catalog writes
+CATALOG_CHANNEL = "movie_catalog_changed"
+
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "512"))
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "300"))
+
+
+def _freeze(value):
+    # Tool arguments can arrive as JSON lists, which are not hashable cache keys
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+class CatalogCache:
+    """
+    Bounded, TTL based read-through cache for movie catalog queries.
+
+    Entries are keyed by the query (function name and arguments) and evicted least-recently-used once
+    `max_entries` is reached. Any write to the catalog clears the whole cache, since a changed rating or
+    genre can move a movie in or out of any cached result.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = 0  # bumped on invalidation so in-flight loads don't repopulate stale rows
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        """
+        Returns the cached value for key, calling loader() and caching its result on a miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+
+        with self._lock:
+            if generation != self._generation:
+                return copy.deepcopy(value)
+            self._entries[key] = (now + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return copy.deepcopy(value)
+
+    def cached(self, fn):
+        """
+        Decorator making a catalog query function read through the cache.
+        """
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (fn.__name__, _freeze(args), _freeze(kwargs))
+            return self.get_or_load(key, lambda: fn(*args, **kwargs))
+        return wrapper
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        """
+        Returns the hit/miss counters; every hit is a catalog query that did not reach the database.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "invalidations": self.invalidations,
+            }
+
+
+catalog_cache = CatalogCache(max_entries=CATALOG_CACHE_MAX_ENTRIES, ttl_seconds=CATALOG_CACHE_TTL_SECONDS)
+
+# Callbacks run when another process announces a catalog change (e.g. to rebuild in-memory indexes)
+_refresh_hooks = []
+
+def register_refresh_hook(callback):
+    _refresh_hooks.append(callback)
+
+def _on_remote_change():
+    catalog_cache.invalidate()
+    for callback in _refresh_hooks:
+        try:
+            callback()
+        except Exception as e:
+            print(f"An error occurred while refreshing after a catalog change: {e}")
+
+def _listen_for_catalog_changes(poll_seconds: float, max_backoff_seconds: float = 60.0):
+    # A dedicated, unpooled connection: LISTEN holds it for the life of the process, so it must not take a
+    # slot from the pool the request handlers use
+    listener_engine = create_engine(engine.url, poolclass=NullPool)
+    backoff_seconds = 1.0
+    connected_before = False
+    while True:
+        connection = None
+        try:
+            connection = listener_engine.raw_connection()
+            dbapi_connection = connection.dbapi_connection
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CATALOG_CHANNEL}")
+            backoff_seconds = 1.0
+            if connected_before:
+                # Notifications sent while we were disconnected are lost; assume something changed
+                _on_remote_change()
+            connected_before = True
+
+            while True:
+                if select.select([dbapi_connection], [], [], poll_seconds) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                if dbapi_connection.notifies:
+                    dbapi_connection.notifies.clear()
+                    _on_remote_change()
+        except Exception as e:
+            print(f"Catalog change listener lost its connection ({e}); reconnecting in {backoff_seconds:.0f}s")
+        finally:
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+        time.sleep(backoff_seconds)
+        backoff_seconds = min(backoff_seconds * 2, max_backoff_seconds)
+
+def start_invalidation_listener(poll_seconds: float = 5.0):
+    """
+    Starts a daemon thread that LISTENs on the catalog channel and invalidates the cache on every NOTIFY,
+    reconnecting with exponential backoff if the connection drops.
+    Only Postgres supports LISTEN/NOTIFY; on other databases the TTL alone bounds staleness.
+    """
+    if engine.dialect.name != "postgresql":
+        return None
+    thread = threading.Thread(target=_listen_for_catalog_changes, args=(poll_seconds,), daemon=True, name="catalog-listener")
+    thread.start()
+    return thread
+
+def get_catalog_cache_stats():
+    return catalog_cache.stats()
+
+# Writes made by this process invalidate immediately
+subscribe(Movie, lambda movie: None, lambda changes: catalog_cache.invalidate())
+subscribe(Showtime, lambda showtime: None, lambda changes: catalog_cache.invalidate())
@@ -0,0 +1,147 @@
+import bisect
+import threading
+from collections import defaultdict
+from sqlalchemy import select, func
+from database import get_db  # Import the get_db function
+from schemas.models import Movie, Review  # SQLAlchemy model
+from utils.model_events import subscribe
+from utils.catalog_cache import register_refresh_hook
+from utils.movie_index import movie_to_dict
+from utils.pagination import decode_cursor, page, sort_scope, INVALID_CURSOR
+
+FACETS = ("genre", "mood", "language")
+
+def _facet_key(value: str):
+    return value.casefold().strip() if value else ""
+
+def _rank_key(row):
+    # Best first: highest rating, then most reviewed, then a stable tie-break on the id
+    return (-row["average_rating"], -row["review_count"], row["movie_id"])
+
+
+class FacetRankings:
+    """
+    Precomputed per-facet rankings (genre, mood, language) of movies by average rating and review volume.
+
+    Every facet value keeps its movies as a sorted list of rank keys, so reading the best titles is a dictionary
+    lookup plus a slice. When a rating or review count changes, only that movie's keys are moved (bisect remove
+    and insert) in the buckets it belongs to.
+    """
+
+    def __init__(self):
+        self.movies = {}  # movie_id -> movie row with review_count
+        self.ordered = {facet: defaultdict(list) for facet in FACETS}  # facet -> value -> sorted rank keys
+        self.loaded = False
+        self._lock = threading.RLock()
+
+    def load(self):
+        """
+        Builds every ranking with a single grouped query over movies and reviews.
+        """
+        with next(get_db()) as db:
+            rows = self._fetch(db)
+
+        with self._lock:
+            self.movies = {}
+            self.ordered = {facet: defaultdict(list) for facet in FACETS}
+            for row in rows:
+                self._insert(row)
+            self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def top(self, facet: str, value: str, limit: int = 5):
+        """
+        Returns the best `limit` movies for a facet value, e.g. top("genre", "Horror").
+        """
+        self.ensure_loaded()
+        with self._lock:
+            keys = self.ordered[facet].get(_facet_key(value), [])[:limit]
+            return [dict(self.movies[key[2]]) for key in keys]
+
+    def page(self, facet: str, value: str, cursor=None, limit: int = 5):
+        """
+        Keyset-paginated variant of `top`: seeks past the cursor's rank key with a bisect.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            bucket = self.ordered[facet].get(_facet_key(value), [])
+            try:
+                after = decode_cursor(cursor, sort_scope(_rank_key))
+                start = bisect.bisect_right(bucket, after) if after is not None else 0
+            except (ValueError, TypeError):
+                return {"error": INVALID_CURSOR}
+            keys = bucket[start:start + limit]
+            has_more = start + limit < len(bucket)
+            return page([dict(self.movies[key[2]]) for key in keys], keys[-1] if has_more else None, sort_scope(_rank_key))
+
+    def refresh_movies(self, movie_ids):
+        """
+        Re-reads rating and review count for the given movies and moves them within their rankings.
+        """
+        if not self.loaded or not movie_ids:
+            return
+        with next(get_db()) as db:
+            rows = self._fetch(db, movie_ids)
+
+        with self._lock:
+            for movie_id in movie_ids:
+                self._delete(movie_id)
+            for row in rows:
+                self._insert(row)
+
+    def _fetch(self, db, movie_ids=None):
+        review_counts = (
+            select(Review.movie_id, func.count(Review.review_id).label("review_count"))
+            .group_by(Review.movie_id)
+            .subquery()
+        )
+        query = select(Movie, func.coalesce(review_counts.c.review_count, 0)).outerjoin(
+            review_counts, review_counts.c.movie_id == Movie.movie_id
+        )
+        if movie_ids is not None:
+            query = query.where(Movie.movie_id.in_(list(movie_ids)))
+        return [
+            dict(movie_to_dict(movie), review_count=review_count)
+            for movie, review_count in db.execute(query).all()
+        ]
+
+    def _insert(self, row):
+        self.movies[row["movie_id"]] = row
+        key = _rank_key(row)
+        for facet in FACETS:
+            bisect.insort(self.ordered[facet][_facet_key(row[facet])], key)
+
+    def _delete(self, movie_id):
+        row = self.movies.pop(movie_id, None)
+        if row is None:
+            return
+        key = _rank_key(row)
+        for facet in FACETS:
+            bucket = self.ordered[facet][_facet_key(row[facet])]
+            index = bisect.bisect_left(bucket, key)
+            if index < len(bucket) and bucket[index] == key:
+                del bucket[index]
+
+
+facet_rankings = FacetRankings()
+
+def _refresh_reviewed_movies(changes):
+    # Deleted reviews don't report their movie, so fall back to a full rebuild (rare: reviews are append-only)
+    if None in changes.values():
+        _reload_after_remote_change()
+    else:
+        facet_rankings.refresh_movies(set(changes.values()))
+
+def _refresh_changed_movies(changes):
+    facet_rankings.refresh_movies(set(changes))
+
+def _reload_after_remote_change():
+    if facet_rankings.loaded:
+        facet_rankings.load()
+
+subscribe(Review, lambda review: review.movie_id, _refresh_reviewed_movies)
+subscribe(Movie, lambda movie: movie.movie_id, _refresh_changed_movies)
+register_refresh_hook(_reload_after_remote_change)
@@ -0,0 +1,91 @@
+import re
+from collections import defaultdict
+
+NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+
+def normalize_name(name: str):
+    """
+    Case-folds a name and collapses punctuation and repeated whitespace, e.g. "The  Silent-Witness" -> "the silent witness".
+    """
+    return NON_ALPHANUMERIC.sub(" ", name.casefold()).strip() if name else ""
+
+def trigrams(name: str):
+    """
+    Returns the set of word trigrams of a normalized name, padded like pg_trgm ("  ab", " ab", "ab ").
+    """
+    grams = set()
+    for word in normalize_name(name).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class FuzzyNameIndex:
+    """
+    Precomputed trigram index for typo and case tolerant name lookups.
+
+    Each name is split into trigrams once; a lookup only scores the names sharing at least one trigram with
+    the query, instead of comparing against every name.
+    """
+
+    def __init__(self):
+        self.names = {}  # key -> display name
+        self.grams = {}  # key -> set of trigrams
+        self.exact = defaultdict(set)  # normalized name -> keys
+        self.postings = defaultdict(set)  # trigram -> keys
+
+    def add(self, key, name: str):
+        self.remove(key)
+        self.names[key] = name
+        self.grams[key] = trigrams(name)
+        self.exact[normalize_name(name)].add(key)
+        for gram in self.grams[key]:
+            self.postings[gram].add(key)
+
+    def remove(self, key):
+        name = self.names.pop(key, None)
+        if name is None:
+            return
+        self.exact[normalize_name(name)].discard(key)
+        for gram in self.grams.pop(key):
+            self.postings[gram].discard(key)
+            if not self.postings[gram]:
+                del self.postings[gram]
+
+    def resolve(self, query: str, limit: int = 5, min_score: float = 0.3):
+        """
+        Returns the names most similar to the query.
+
+        Args:
+        - query: The (possibly misspelled or partial) name to look up.
+        - limit: Maximum number of candidates to return, or None for all of them.
+        - min_score: Candidates scoring below this similarity are dropped.
+
+        Returns:
+        - List of (key, name, score) tuples, best first. An exact case-insensitive match scores 1.0.
+        """
+        exact = self.exact.get(normalize_name(query), set())
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for key in self.postings.get(gram, ()):
+                shared[key] += 1
+
+        candidates = []
+        for key, count in shared.items():
+            if key in exact:
+                score = 1.0
+            else:
+                # Dice coefficient for whole-name typos, discounted containment for partial names ("phoenix").
+                # Containment is skipped for very short queries, which would otherwise match half the catalog.
+                score = 2 * count / (len(query_grams) + len(self.grams[key]))
+                if len(query_grams) >= 6:
+                    score = max(score, 0.9 * count / len(query_grams))
+            if score >= min_score:
+                candidates.append((key, self.names[key], round(score, 3)))
+
+        candidates.sort(key=lambda candidate: (-candidate[2], candidate[1], candidate[0]))
+        return candidates[:limit]
@@ -0,0 +1,40 @@
+import numpy as np
+from math import radians, cos
+
+EARTH_RADIUS_KM = 6371  # Radius of Earth in kilometers
+KM_PER_DEGREE = 111.195  # Length of one degree of latitude (and of longitude at the equator)
+
+def bounding_box(lat: float, lon: float, radius_km: float):
+    """
+    Returns (min_lat, max_lat, min_lon, max_lon) of a box that contains every point within radius_km.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    # Meridians converge towards the poles, so a kilometer spans more degrees of longitude
+    dlon = radius_km / (KM_PER_DEGREE * max(cos(radians(lat)), 1e-6))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+def haversine_radians(lat1, lon1, cos_lat1, lat2, lon2, cos_lat2):
+    """
+    Vectorized haversine distance in kilometers for NumPy arrays of coordinates already converted to radians.
+    The cosines of the latitudes are passed in so callers can precompute them once per point.
+    All arguments broadcast, so (users, 1) against (theaters,) yields a (users, theaters) distance matrix.
+    """
+    a = np.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos_lat2 * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def haversine_matrix(user_lats, user_lons, lats, lons):
+    """
+    Distances in kilometers between every user location and every point, computed in one NumPy pass.
+
+    Args:
+    - user_lats, user_lons: Sequences of user coordinates in degrees.
+    - lats, lons: Sequences of point (e.g. theater) coordinates in degrees.
+
+    Returns:
+    - float64 array of shape (len(user_lats), len(lats)).
+    """
+    user_lats = np.radians(np.asarray(user_lats, dtype=np.float64))[:, None]
+    user_lons = np.radians(np.asarray(user_lons, dtype=np.float64))[:, None]
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    return haversine_radians(user_lats, user_lons, np.cos(user_lats), lats, lons, np.cos(lats))
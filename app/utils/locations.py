@@ -0,0 +1,80 @@
+import threading
+from sqlalchemy import select
+from database import get_db  # Import the get_db function
+from schemas.models import Location, LocationAlias  # SQLAlchemy model
+from utils.catalog_cache import register_refresh_hook
+from utils.fuzzy import FuzzyNameIndex, normalize_name
+
+
+class LocationDirectory:
+    """
+    In-memory resolver from free-text location names ("andheri west", "Vile-Parle", "santa cruz") to location_ids.
+
+    Canonical names and aliases are looked up by their normalized key; anything else falls back to a trigram
+    match over the same names, so small typos still resolve. The dimension is tiny and rarely changes, so it is
+    loaded once and rebuilt when another process announces a catalog change.
+    """
+
+    def __init__(self, min_score: float = 0.5):
+        self.min_score = min_score
+        self.names = {}  # location_id -> display name
+        self.keys = {}  # normalized name or alias -> location_id
+        self.fuzzy = FuzzyNameIndex()
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        with next(get_db()) as db:
+            locations = db.execute(select(Location.location_id, Location.name)).all()
+            aliases = db.execute(select(LocationAlias.alias_key, LocationAlias.location_id)).all()
+
+        names, keys, fuzzy = {}, {}, FuzzyNameIndex()
+        for location_id, name in locations:
+            names[location_id] = name
+            keys[normalize_name(name)] = location_id
+        for alias, location_id in aliases:
+            keys[normalize_name(alias)] = location_id
+        for key, location_id in keys.items():
+            fuzzy.add(key, key)
+
+        with self._lock:
+            self.names, self.keys, self.fuzzy = names, keys, fuzzy
+            self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def resolve(self, location: str):
+        """
+        Returns the location_id for a free-text location name, or None when nothing matches.
+        """
+        self.ensure_loaded()
+        key = normalize_name(location)
+        with self._lock:
+            if key in self.keys:
+                return self.keys[key]
+            matches = self.fuzzy.resolve(key, limit=1, min_score=self.min_score)
+            return self.keys[matches[0][0]] if matches else None
+
+    def location_of(self, theater: dict):
+        """
+        Returns the location_id of a theater row, resolving its free-text theater_location when the theater
+        has not been linked to a location yet.
+        """
+        if theater["location_id"] is not None:
+            return theater["location_id"]
+        return self.resolve(theater["theater_location"])
+
+    def name(self, location_id: int):
+        self.ensure_loaded()
+        return self.names.get(location_id)
+
+
+location_directory = LocationDirectory()
+
+def _reload_after_remote_change():
+    if location_directory.loaded:
+        location_directory.load()
+
+register_refresh_hook(_reload_after_remote_change)
@@ -0,0 +1,60 @@
+from collections import defaultdict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# model class -> list of (snapshot, callback) pairs
+_subscribers = defaultdict(list)
+
+def subscribe(model, snapshot, callback):
+    """
+    Registers a callback that runs after a commit which inserted, updated or deleted rows of a model.
+
+    Args:
+    - model: The SQLAlchemy model class to watch.
+    - snapshot: Function turning a flushed instance into a plain value (e.g. a dict of its columns).
+      It runs at flush time, while the instance attributes are still loaded.
+    - callback: Function called with a dictionary of {primary key: snapshot or None}, where None marks a deleted row.
+    """
+    _subscribers[model].append((snapshot, callback))
+
+def _primary_key(obj):
+    # New rows only get an identity key once the flush is finalized, so read the column values instead
+    identity = tuple(inspect(type(obj)).primary_key_from_instance(obj))
+    if any(value is None for value in identity):
+        return None
+    return identity[0] if len(identity) == 1 else identity
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    if not _subscribers:
+        return
+
+    pending = session.info.setdefault("model_events", {})
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        model = type(obj)
+        if model not in _subscribers:
+            continue
+
+        deleted = obj in session.deleted
+        for index, (snapshot, _) in enumerate(_subscribers[model]):
+            changes = pending.setdefault((model, index), {})
+            key = _primary_key(obj)
+            if key is None:
+                continue
+            changes[key] = None if deleted else snapshot(obj)
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session):
+    pending = session.info.pop("model_events", {})
+    for (model, index), changes in pending.items():
+        if not changes:
+            continue
+        _, callback = _subscribers[model][index]
+        try:
+            callback(changes)
+        except Exception as e:
+            print(f"An error occurred while applying {model.__name__} changes: {e}")
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("model_events", None)
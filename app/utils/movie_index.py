@@ -0,0 +1,228 @@
+import re
+import heapq
+from collections import defaultdict
+from threading import RLock
+from sqlalchemy import select
+from database import get_db  # Import the get_db function
+from schemas.models import Movie  # SQLAlchemy model
+from utils.model_events import subscribe
+from utils.catalog_cache import register_refresh_hook
+from utils.fuzzy import FuzzyNameIndex
+
+MOVIE_FIELDS = (
+    "movie_id",
+    "movie_name",
+    "movie_description",
+    "genre",
+    "cast",
+    "language",
+    "mood",
+    "average_rating",
+)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Words too common to narrow a search: "the dark" should find dark movies, not every movie mentioning "the"
+STOP_WORDS = frozenset({
+    "a", "an", "and", "the", "of", "to", "in", "on", "for", "with", "about", "at", "by", "from", "into",
+    "is", "are", "was", "be", "it", "its", "that", "this", "or", "as", "his", "her", "their",
+})
+
+# A query word that is no token of the field matches the tokens containing it ("interst"), or, when it is
+# shorter than this, only the tokens starting with it (initials such as the "d" of "John D")
+MIN_PARTIAL_LENGTH = 3
+
+def movie_to_dict(movie):
+    """
+    Converts a Movie row into a plain dictionary of its columns.
+    """
+    return {field: getattr(movie, field) for field in MOVIE_FIELDS}
+
+def tokenize(text: str):
+    """
+    Splits text into lowercase alphanumeric tokens.
+    """
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+def query_terms(query: str):
+    """
+    Returns the distinct search terms of a query, without stop words unless the query has nothing else.
+    """
+    terms = set(tokenize(query))
+    return (terms - STOP_WORDS) or terms
+
+
+class MovieTextIndex:
+    """
+    In-memory inverted index (token -> movie_id postings) over the free-text columns of the movies table,
+    plus a trigram index over movie names for fuzzy title lookups.
+
+    The index is built from the database on first use (or explicitly via `load`) and kept up to date
+    incrementally with `upsert` and `remove`, which are wired to committed Movie changes below.
+    """
+
+    def __init__(self, fields=("movie_description", "cast")):
+        self.fields = fields
+        self.movies = {}
+        self.postings = {field: defaultdict(set) for field in fields}
+        self.names = FuzzyNameIndex()
+        self.loaded = False
+        self._lock = RLock()
+
+    def load(self):
+        """
+        (Re)builds the whole index from the movies table.
+        """
+        with next(get_db()) as db:
+            rows = [movie_to_dict(movie) for movie in db.execute(select(Movie)).scalars().all()]
+
+        with self._lock:
+            self.movies = {}
+            self.postings = {field: defaultdict(set) for field in self.fields}
+            self.names = FuzzyNameIndex()
+            for row in rows:
+                self._add(row)
+            self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def upsert(self, row: dict):
+        """
+        Adds a movie to the index, replacing any previous postings for the same movie_id.
+        """
+        with self._lock:
+            self._remove(row["movie_id"])
+            self._add(row)
+
+    def remove(self, movie_id: int):
+        with self._lock:
+            self._remove(movie_id)
+
+    def search(self, field: str, query: str, limit: int = 5):
+        """
+        Returns the movies whose `field` contains every term of the query (stop words aside).
+
+        A term matches a whole token of the text; a term that is not a token anywhere in the field matches the
+        tokens containing it instead, so partial words ("Interst") still find their movies.
+
+        Args:
+        - field: One of the indexed fields ('movie_description' or 'cast').
+        - query: Free-text query; it is tokenized the same way as the indexed text.
+        - limit: Maximum number of movies to return, or None for every match in no particular order
+          (for callers that rank or paginate the matches themselves).
+
+        Returns:
+        - List of movie dictionaries ranked by `match_score` (then average rating): the fraction of query terms
+          found as whole words, partial matches counting half.
+        """
+        self.ensure_loaded()
+        terms = query_terms(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            scores = self._match(self.postings[field], terms)
+            rank_key = lambda item: (-item[1], -self.movies[item[0]]["average_rating"], item[0])
+            if limit is None:
+                ranked = scores.items()
+            else:
+                ranked = heapq.nsmallest(limit, scores.items(), key=rank_key)
+            return [
+                dict(self.movies[movie_id], match_score=round(score / len(terms), 3))
+                for movie_id, score in ranked
+            ]
+
+    def matching_ids(self, field: str, query: str):
+        """
+        Returns the set of movie_ids whose `field` contains every term of the query, matched as in `search`.
+        """
+        self.ensure_loaded()
+        terms = query_terms(query)
+        if not terms:
+            return set()
+
+        with self._lock:
+            return set(self._match(self.postings[field], terms))
+
+    def resolve_name(self, movie_name: str, limit: int = 5, min_score: float = 0.3):
+        """
+        Returns the movies whose names best match a possibly misspelled or partial title.
+
+        Returns:
+        - List of movie dictionaries, best match first, each with a `similarity` score (1.0 for an exact,
+          case-insensitive match).
+        """
+        self.ensure_loaded()
+        with self._lock:
+            return [
+                dict(self.movies[movie_id], similarity=score)
+                for movie_id, _, score in self.names.resolve(movie_name, limit=limit, min_score=min_score)
+            ]
+
+    def _match(self, postings, terms):
+        """
+        Returns {movie_id: score} for the movies matching every term: 1 per whole-token match, 0.5 per partial one.
+        """
+        # Intersect starting from the rarest term to keep the working set small
+        scores = None
+        for term in sorted(terms, key=lambda term: len(postings.get(term, ()))):
+            if term in postings:
+                term_ids, weight = postings[term], 1.0
+            else:
+                # Not a token anywhere: fall back to a scan of the field's vocabulary, like LIKE '%...%' did
+                term_ids, weight = set(), 0.5
+                short = len(term) < MIN_PARTIAL_LENGTH
+                for token, ids in postings.items():
+                    if token.startswith(term) if short else term in token:
+                        term_ids |= ids
+
+            if scores is None:
+                scores = dict.fromkeys(term_ids, weight)
+            else:
+                scores = {movie_id: score + weight for movie_id, score in scores.items() if movie_id in term_ids}
+            if not scores:
+                return {}
+        return scores
+
+    def _add(self, row):
+        self.movies[row["movie_id"]] = row
+        self.names.add(row["movie_id"], row["movie_name"])
+        for field in self.fields:
+            for token in set(tokenize(row[field])):
+                self.postings[field][token].add(row["movie_id"])
+
+    def _remove(self, movie_id):
+        row = self.movies.pop(movie_id, None)
+        if row is None:
+            return
+        self.names.remove(movie_id)
+        for field in self.fields:
+            postings = self.postings[field]
+            for token in set(tokenize(row[field])):
+                postings[token].discard(movie_id)
+                if not postings[token]:
+                    del postings[token]
+
+
+movie_text_index = MovieTextIndex()
+
+def _apply_movie_changes(changes):
+    # Only patch an index that has been built; an unloaded one picks the changes up when it loads
+    if not movie_text_index.loaded:
+        return
+    for movie_id, row in changes.items():
+        if row is None:
+            movie_text_index.remove(movie_id)
+        else:
+            movie_text_index.upsert(row)
+
+subscribe(Movie, movie_to_dict, _apply_movie_changes)
+
+def _reload_after_remote_change():
+    # Another process rewrote movies; rebuild rather than patch, since we don't know which rows changed
+    if movie_text_index.loaded:
+        movie_text_index.load()
+
+register_refresh_hook(_reload_after_remote_change)
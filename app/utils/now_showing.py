@@ -0,0 +1,159 @@
+import bisect
+import threading
+from datetime import datetime, timedelta
+from collections import defaultdict
+from sqlalchemy import select
+from database import get_db  # Import the get_db function
+from schemas.models import Showtime  # SQLAlchemy model
+from utils.model_events import subscribe
+from utils.catalog_cache import register_refresh_hook
+
+def hour_bucket(moment: datetime):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def parse_show_time(value):
+    """
+    Parses a 'YYYY-MM-DD HH:MM:SS' (or ISO 8601) string into a datetime; datetimes are returned unchanged.
+
+    Raises:
+    - ValueError: If the string is not a valid date and time.
+    """
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+class NowShowingIndex:
+    """
+    In-memory "now showing" index: upcoming showtimes bucketed by hour.
+
+    Each hour bucket maps a movie_id to the sorted show times of that movie within the hour, so a time window
+    is answered by visiting only the buckets it overlaps: inner buckets contribute their first show time per
+    movie directly and only the two edge buckets need a bisect. Past hours are dropped as the clock moves on,
+    and committed Showtime writes are applied incrementally.
+    """
+
+    def __init__(self):
+        self.buckets = {}  # hour -> movie_id -> sorted [(show_time, showtime_id)]
+        self.hours = []  # sorted bucket hours
+        self.showtimes = {}  # showtime_id -> (movie_id, show_time)
+        self.horizon = None  # earliest hour covered; older showtimes are not indexed
+        self.loaded = False
+        self._lock = threading.RLock()
+
+    def load(self):
+        """
+        (Re)builds the index from every showtime from the current hour onwards.
+        """
+        horizon = hour_bucket(datetime.now())
+        with next(get_db()) as db:
+            rows = db.execute(
+                select(Showtime.showtime_id, Showtime.movie_id, Showtime.show_time).where(Showtime.show_time >= horizon)
+            ).all()
+
+        with self._lock:
+            self.buckets = {}
+            self.hours = []
+            self.showtimes = {}
+            self.horizon = horizon
+            for showtime_id, movie_id, show_time in rows:
+                self._add(showtime_id, movie_id, show_time)
+            self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def covers(self, start: datetime):
+        """
+        Whether a window starting at `start` can be answered from the index (it does not hold past showtimes).
+        """
+        self.ensure_loaded()
+        self.roll_forward()
+        return start >= self.horizon
+
+    def roll_forward(self):
+        """
+        Drops the buckets of hours that have fully passed.
+        """
+        horizon = hour_bucket(datetime.now())
+        with self._lock:
+            if self.horizon is None or horizon <= self.horizon:
+                return
+            expired = bisect.bisect_left(self.hours, horizon)
+            for hour in self.hours[:expired]:
+                for entries in self.buckets.pop(hour).values():
+                    for _, showtime_id in entries:
+                        self.showtimes.pop(showtime_id, None)
+            del self.hours[:expired]
+            self.horizon = horizon
+
+    def next_showtimes(self, start: datetime, end: datetime):
+        """
+        Returns {movie_id: earliest show_time} for the distinct movies showing between `start` and `end` (inclusive).
+        """
+        self.ensure_loaded()
+        self.roll_forward()
+        first_hour, last_hour = hour_bucket(start), hour_bucket(end)
+        result = {}
+        with self._lock:
+            low = bisect.bisect_left(self.hours, first_hour)
+            high = bisect.bisect_right(self.hours, last_hour)
+            for hour in self.hours[low:high]:
+                edge = hour == first_hour or hour == last_hour
+                for movie_id, entries in self.buckets[hour].items():
+                    if movie_id in result:
+                        continue  # Buckets are visited in time order, so the first hit is the earliest
+                    if edge:
+                        index = bisect.bisect_left(entries, (start,))
+                        if index == len(entries) or entries[index][0] > end:
+                            continue
+                        result[movie_id] = entries[index][0]
+                    else:
+                        result[movie_id] = entries[0][0]
+        return result
+
+    def apply(self, changes):
+        """
+        Applies committed showtime changes ({showtime_id: (movie_id, show_time) or None}).
+        """
+        with self._lock:
+            for showtime_id, row in changes.items():
+                self._remove(showtime_id)
+                if row is not None and row[1] >= self.horizon:
+                    self._add(showtime_id, *row)
+
+    def _add(self, showtime_id, movie_id, show_time):
+        hour = hour_bucket(show_time)
+        if hour not in self.buckets:
+            self.buckets[hour] = defaultdict(list)
+            bisect.insort(self.hours, hour)
+        bisect.insort(self.buckets[hour][movie_id], (show_time, showtime_id))
+        self.showtimes[showtime_id] = (movie_id, show_time)
+
+    def _remove(self, showtime_id):
+        row = self.showtimes.pop(showtime_id, None)
+        if row is None:
+            return
+        movie_id, show_time = row
+        hour = hour_bucket(show_time)
+        entries = self.buckets[hour][movie_id]
+        entries.remove((show_time, showtime_id))
+        if not entries:
+            del self.buckets[hour][movie_id]
+        if not self.buckets[hour]:
+            del self.buckets[hour]
+            self.hours.remove(hour)
+
+
+now_showing = NowShowingIndex()
+
+def _apply_showtime_changes(changes):
+    # Only patch an index that has been built; an unloaded one picks the changes up when it loads
+    if now_showing.loaded:
+        now_showing.apply(changes)
+
+def _reload_after_remote_change():
+    if now_showing.loaded:
+        now_showing.load()
+
+subscribe(Showtime, lambda showtime: (showtime.movie_id, showtime.show_time), _apply_showtime_changes)
+register_refresh_hook(_reload_after_remote_change)
@@ -0,0 +1,184 @@
+import json
+import zlib
+import base64
+import heapq
+from datetime import datetime
+from sqlalchemy import and_, or_, DateTime
+
+INVALID_CURSOR = "Invalid cursor; pass the next_cursor value from the previous result unchanged."
+
+def sort_scope(ordering):
+    """
+    Returns a short tag naming an ordering (a sort key function, or the ORDER BY columns of `paginate_query`),
+    so a cursor handed to another tool is rejected instead of being compared with keys of another kind.
+    """
+    if callable(ordering):
+        name = f"{ordering.__module__}.{ordering.__qualname__}"
+    else:
+        name = ",".join(f"{column}{' desc' if descending else ''}" for column, descending in ordering)
+    return format(zlib.crc32(name.encode("utf-8")), "08x")
+
+def encode_cursor(key, scope: str = ""):
+    """
+    Encodes the sort key of the last returned row, tagged with its ordering's `sort_scope`, into an opaque,
+    URL-safe cursor string.
+    """
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    return base64.urlsafe_b64encode(json.dumps({"scope": scope, "key": values}).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor, scope: str = ""):
+    """
+    Decodes a cursor produced by `encode_cursor` back into a sort key tuple, or None when no cursor is given.
+
+    Raises:
+    - ValueError: If the cursor is malformed or was issued for another ordering than `scope`.
+    """
+    if not cursor:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        data = None
+    if not isinstance(data, dict) or data.get("scope") != scope:
+        raise ValueError(INVALID_CURSOR)
+    key = data.get("key")
+    if not isinstance(key, list) or not key:
+        raise ValueError(INVALID_CURSOR)
+    return tuple(key)
+
+def page(results, next_key=None, scope: str = ""):
+    """
+    Builds the paginated response returned by the search tools.
+    """
+    return {"results": results, "next_cursor": encode_cursor(next_key, scope) if next_key is not None else None}
+
+def paginate_sorted(rows, sort_key, cursor=None, limit: int = 5):
+    """
+    Keyset pagination over an in-memory result set, in ascending `sort_key` order.
+
+    The rows need not be sorted: the ones at or before the cursor are filtered out by their key and only the
+    page itself is selected (a heap of limit + 1), so a page costs O(n log limit) rather than a full sort.
+    The caller still materializes every candidate row, so this is keyset over the candidates, not a seek
+    into an index; use `paginate_query` or a precomputed ranking when the candidate set is large.
+
+    Args:
+    - rows: Result rows, in any order.
+    - sort_key: Function returning the (unique) sort key tuple of a row.
+    - cursor: Cursor from the previous page, or None for the first page.
+    - limit: Page size.
+
+    Returns:
+    - The paginated response dictionary (see `page`), or an error dictionary for an invalid cursor.
+    """
+    scope = sort_scope(sort_key)
+    try:
+        after = decode_cursor(cursor, scope)
+        if after is not None:
+            if rows and len(after) != len(sort_key(rows[0])):
+                raise ValueError(INVALID_CURSOR)
+            rows = [row for row in rows if _json_key(sort_key(row)) > after]
+    except (ValueError, TypeError):
+        # TypeError: a cursor from another tool, whose key doesn't compare with these rows
+        return {"error": INVALID_CURSOR}
+
+    results = heapq.nsmallest(limit + 1, rows, key=sort_key)
+    has_more = len(results) > limit
+    results = results[:limit]
+    return page(results, sort_key(results[-1]) if has_more else None, scope)
+
+def paginate_ranked(rows, sort_key, cursor=None, limit: int = 5):
+    """
+    Keyset pagination over rows already in ascending `sort_key` order, such as a precomputed ranking.
+    The cursor is found by binary search, so a page costs O(log n + limit) however many rows there are.
+
+    Args:
+    - rows: Sequence of rows (e.g. ids) sorted by `sort_key`.
+    - sort_key: Function returning the (unique) sort key tuple of a row.
+    - cursor: Cursor from the previous page, or None for the first page.
+    - limit: Page size.
+
+    Returns:
+    - The paginated response dictionary (see `page`), or an error dictionary for an invalid cursor.
+    """
+    scope = sort_scope(sort_key)
+    start = 0
+    try:
+        after = decode_cursor(cursor, scope)
+        if after is not None:
+            if len(rows) and len(after) != len(sort_key(rows[0])):
+                raise ValueError(INVALID_CURSOR)
+            end = len(rows)
+            while start < end:
+                middle = (start + end) // 2
+                if _json_key(sort_key(rows[middle])) > after:
+                    end = middle
+                else:
+                    start = middle + 1
+    except (ValueError, TypeError):
+        return {"error": INVALID_CURSOR}
+
+    results = [rows[position] for position in range(start, min(start + limit + 1, len(rows)))]
+    has_more = len(results) > limit
+    results = results[:limit]
+    return page(results, sort_key(results[-1]) if has_more else None, scope)
+
+def _json_key(key):
+    # The key as it reads back from a cursor (datetimes become ISO strings), so the two compare
+    return tuple(value.isoformat() if isinstance(value, datetime) else value for value in key)
+
+def keyset_condition(columns, after):
+    """
+    Builds the WHERE clause selecting rows that sort strictly after a cursor key.
+
+    Args:
+    - columns: List of (column expression, descending) pairs, matching the query's ORDER BY.
+    - after: Decoded cursor key with one value per column.
+
+    Returns:
+    - An expression such as `rating < :r OR (rating = :r AND movie_id > :id)`.
+    """
+    # Datetimes travel through the cursor as ISO strings
+    after = [
+        datetime.fromisoformat(value) if isinstance(column.type, DateTime) and isinstance(value, str) else value
+        for (column, _), value in zip(columns, after)
+    ]
+
+    clauses = []
+    for position, (column, descending) in enumerate(columns):
+        equal = [previous == value for (previous, _), value in zip(columns[:position], after)]
+        beyond = column < after[position] if descending else column > after[position]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+def paginate_query(db, query, columns, cursor=None, limit: int = 5, row_key=None, to_dict=None):
+    """
+    Runs a keyset-paginated SELECT: orders by `columns`, seeks past the cursor and fetches one extra row
+    to know whether another page exists. No OFFSET is used, so every page costs the same.
+
+    Args:
+    - db: Database session.
+    - query: The filtered SELECT statement.
+    - columns: List of (column expression, descending) pairs defining a unique ordering.
+    - cursor: Cursor from the previous page, or None for the first page.
+    - limit: Page size.
+    - row_key: Function returning the sort key tuple of a result row.
+    - to_dict: Function converting a result row into the returned dictionary.
+
+    Returns:
+    - The paginated response dictionary (see `page`), or an error dictionary for an invalid cursor.
+    """
+    scope = sort_scope(columns)
+    try:
+        after = decode_cursor(cursor, scope)
+        if after is not None:
+            if len(after) != len(columns):
+                raise ValueError(INVALID_CURSOR)
+            query = query.where(keyset_condition(columns, after))
+    except ValueError:
+        return {"error": INVALID_CURSOR}
+    order_by = [column.desc() if descending else column for column, descending in columns]
+
+    rows = db.execute(query.order_by(*order_by).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return page([to_dict(row) for row in rows], row_key(rows[-1]) if has_more else None, scope)
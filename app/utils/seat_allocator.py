@@ -0,0 +1,46 @@
+"""
+Best-available seat allocation for group bookings, run directly on a showtime's seat bitmap.
+"""
+
+PREFERENCES = ("center", "front", "back")
+
+def find_best_block(layout, bitmap: int, count: int, category=None, preference: str = "center"):
+    """
+    Finds the best block of `count` adjacent free seats in one row, never across an aisle.
+
+    Blocks are scored by how far their middle is from the centre of the row, plus how far their row is from the
+    preferred one (the middle row for "center", the row nearest or furthest from the screen for "front" and
+    "back"); the lowest score wins, ties going to the row nearest the screen and then the leftmost block.
+
+    Args:
+    - layout: The CompiledLayout of the showtime.
+    - bitmap: The showtime's seat bitmap (bit set = seat booked or held).
+    - count: The number of seats wanted together.
+    - category: Optional SeatCategory the seats must belong to.
+    - preference: One of PREFERENCES.
+
+    Returns:
+    - The seat indices of the best block, or None when no row has `count` adjacent free seats.
+    """
+    last_row = len(layout.rows) - 1
+    preferred_row = {"center": last_row / 2, "front": 0, "back": last_row}[preference]
+    row_centre = (layout.columns - 1) / 2
+    block = (1 << count) - 1
+
+    best, best_score = None, None
+    for row in range(len(layout.rows)):
+        if category is not None and layout.row_categories[row] is not category:
+            continue
+        free = ~(bitmap >> row * layout.columns)  # bit i set = seat i of the row is free
+        for first, last in layout.sections:
+            for start in range(first, last - count + 2):
+                if (free >> start) & block != block:
+                    continue
+                score = abs(start + (count - 1) / 2 - row_centre) + abs(row - preferred_row)
+                if best_score is None or score < best_score:
+                    best, best_score = (row, start), score
+
+    if best is None:
+        return None
+    row, start = best
+    return [row * layout.columns + start + offset for offset in range(count)]
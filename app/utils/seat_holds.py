@@ -0,0 +1,132 @@
+"""
+Short-lived seat holds for two-phase booking.
+
+A booking first holds its seats: one seat_holds row per seat, guarded by the unique (showtime_id, seat_no)
+constraint, with the seats' bits set in the showtime's seat bitmap. The payment call then runs with no database
+session open, and the hold is confirmed (turned into bookings) or released afterwards. Holds that are never
+confirmed expire after SEAT_HOLD_TTL_SECONDS and are released by a background sweeper.
+"""
+import os
+import time
+import uuid
+import threading
+from datetime import datetime, timedelta
+from collections import defaultdict
+from sqlalchemy import select, insert, delete
+from sqlalchemy.exc import IntegrityError
+from database import get_db  # Import the get_db function
+from schemas.models import SeatHold  # SQLAlchemy model
+from utils.seat_inventory import seat_inventory, popcount
+from utils.seat_layouts import seat_layouts
+
+SEAT_HOLD_TTL_SECONDS = int(os.getenv("SEAT_HOLD_TTL_SECONDS", "300"))
+
+def place_hold(db, showtime_id: int, user_id: str, seat_nos):
+    """
+    Holds the given seats for SEAT_HOLD_TTL_SECONDS. The caller commits; on a conflict the session is rolled back.
+
+    Returns:
+    - The hold token identifying the held seats.
+
+    Raises:
+    - ValueError: If the showtime doesn't exist, a seat number is invalid, or a seat is already held or booked.
+    """
+    layout = seat_layouts.for_showtime(showtime_id, db)
+    if layout is None:
+        raise ValueError(f"Showtime with ID {showtime_id} does not exist.")
+    mask = layout.mask(seat_nos)
+    seat_nos = [layout.label(index) for index in range(layout.seat_count) if mask >> index & 1]
+
+    # Expired holds on this showtime must not block the new one, whether or not the sweeper has run yet
+    expire_holds(db, showtime_id)
+
+    hold_token = str(uuid.uuid4())
+    expires_at = datetime.now() + timedelta(seconds=SEAT_HOLD_TTL_SECONDS)
+    try:
+        # One multi-row INSERT; a seat held concurrently by someone else violates the unique constraint
+        db.execute(insert(SeatHold), [
+            {"hold_token": hold_token, "showtime_id": showtime_id, "seat_no": seat_no, "user_id": user_id, "expires_at": expires_at}
+            for seat_no in seat_nos
+        ])
+    except IntegrityError:
+        db.rollback()
+        raise ValueError(f"Seat(s) {', '.join(seat_nos)} are currently held by another booking; please try again shortly.")
+
+    booked, taken = seat_inventory.book(showtime_id, mask, db)
+    if not booked:
+        db.rollback()
+        taken_seats = [seat_no for seat_no in seat_nos if taken >> layout.index(seat_no) & 1]
+        raise ValueError(f"Seat(s) {', '.join(taken_seats)} are already booked for this showtime.")
+    return hold_token
+
+def confirm_hold(db, hold_token: str, seat_count: int):
+    """
+    Consumes a hold once payment has succeeded; the seats stay marked in the bitmap. The caller writes the
+    bookings and commits in the same transaction.
+
+    Returns:
+    - True if all `seat_count` seats were still held, False if the hold was released or swept in the meantime.
+    """
+    deleted = db.execute(
+        delete(SeatHold).where(SeatHold.hold_token == hold_token).execution_options(synchronize_session=False)
+    ).rowcount
+    return deleted == seat_count
+
+def release_hold(db, hold_token: str):
+    """
+    Releases the seats of a hold (e.g. after a failed payment). The caller commits.
+    """
+    holds = db.execute(select(SeatHold).where(SeatHold.hold_token == hold_token)).scalars().all()
+    return _release(db, holds)
+
+def expire_holds(db, showtime_id: int = None):
+    """
+    Releases every hold past its expiry, optionally only on one showtime. The caller commits.
+
+    Returns:
+    - The number of seats released.
+    """
+    query = select(SeatHold).where(SeatHold.expires_at <= datetime.now())
+    if showtime_id is not None:
+        query = query.where(SeatHold.showtime_id == showtime_id)
+    return _release(db, db.execute(query).scalars().all())
+
+def held_seats(db, showtime_id: int):
+    """
+    Returns the seat numbers currently held (and not yet expired) on a showtime.
+    """
+    return set(db.execute(
+        select(SeatHold.seat_no).where(SeatHold.showtime_id == showtime_id, SeatHold.expires_at > datetime.now())
+    ).scalars().all())
+
+def _release(db, holds):
+    # Delete the rows one by one and only free the seats whose row we actually deleted, so a hold that is
+    # confirmed or released concurrently never has its seats freed twice
+    masks = defaultdict(int)
+    for hold in holds:
+        deleted = db.execute(
+            delete(SeatHold).where(SeatHold.hold_id == hold.hold_id).execution_options(synchronize_session=False)
+        ).rowcount
+        if deleted:
+            masks[hold.showtime_id] |= seat_layouts.for_showtime(hold.showtime_id, db).mask([hold.seat_no])
+    for showtime_id, mask in masks.items():
+        seat_inventory.release(showtime_id, mask, db)
+    return sum(popcount(mask) for mask in masks.values())
+
+def _sweep_expired_holds(interval_seconds: float):
+    while True:
+        try:
+            with next(get_db()) as db:
+                expire_holds(db)
+                db.commit()
+        except Exception as e:
+            print(f"An error occurred while releasing expired seat holds: {e}")
+        time.sleep(interval_seconds)
+
+def start_hold_sweeper(interval_seconds: float = 30.0):
+    """
+    Starts a daemon thread that releases expired holds every `interval_seconds`.
+    """
+    thread = threading.Thread(target=_sweep_expired_holds, args=(interval_seconds,), daemon=True, name="seat-hold-sweeper")
+    thread.start()
+    return thread
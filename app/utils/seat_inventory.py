@@ -0,0 +1,105 @@
+import threading
+from sqlalchemy import select, update
+from database import get_db  # Import the get_db function
+from schemas.models import Showtime  # SQLAlchemy model
+from utils.seat_layouts import seat_layouts
+
+def popcount(bitmap: int):
+    return bin(bitmap).count("1")
+
+
+class SeatInventory:
+    """
+    Seat inventory of every showtime as a 64-bit bitmap (bit i set = seat i of the showtime's layout booked),
+    stored in `showtimes.seat_bitmap` and mirrored in memory.
+
+    Reading a seat map is a single integer fetch and counting free seats is a popcount. Booking and releasing
+    are a compare-and-set on the bitmap: the UPDATE only applies if the stored value still equals the one the
+    new bitmap was computed from, so two concurrent bookings of the same seat cannot both succeed.
+    """
+
+    def __init__(self, max_attempts: int = 5):
+        self.max_attempts = max_attempts
+        self.bitmaps = {}  # showtime_id -> last known bitmap
+        self._lock = threading.Lock()
+
+    def get(self, showtime_id: int, refresh: bool = True, db=None):
+        """
+        Returns the booked-seat bitmap of a showtime, or None if the showtime doesn't exist.
+        With refresh=False the in-memory mirror is used when present (it may lag writes from other processes).
+        """
+        if not refresh:
+            with self._lock:
+                if showtime_id in self.bitmaps:
+                    return self.bitmaps[showtime_id]
+
+        if db is None:
+            with next(get_db()) as db:
+                return self.get(showtime_id, refresh=True, db=db)
+
+        bitmap = db.execute(select(Showtime.seat_bitmap).where(Showtime.showtime_id == showtime_id)).scalar()
+        if bitmap is not None:
+            self._remember(showtime_id, bitmap)
+        return bitmap
+
+    def available_count(self, showtime_id: int):
+        bitmap = self.get(showtime_id, refresh=False)
+        return None if bitmap is None else seat_layouts.for_showtime(showtime_id).seat_count - popcount(bitmap)
+
+    def book(self, showtime_id: int, mask: int, db=None):
+        """
+        Atomically marks the seats in `mask` as booked.
+
+        Returns:
+        - Tuple (booked, taken_mask): booked is True when every seat was free and is now booked; otherwise
+          taken_mask holds the seats that were already booked and nothing is changed.
+        """
+        return self._compare_and_set(showtime_id, lambda bitmap: (bitmap & mask, bitmap | mask), db)
+
+    def release(self, showtime_id: int, mask: int, db=None):
+        """
+        Atomically marks the seats in `mask` as available again.
+        """
+        booked, _ = self._compare_and_set(showtime_id, lambda bitmap: (0, bitmap & ~mask), db)
+        return booked
+
+    def _compare_and_set(self, showtime_id, change, db=None):
+        if db is None:
+            with next(get_db()) as db:
+                result = self._compare_and_set(showtime_id, change, db)
+                db.commit()
+                return result
+
+        expected = self.get(showtime_id, refresh=False, db=db)
+        fresh = False  # whether `expected` was read from the database rather than the mirror
+        for _ in range(self.max_attempts):
+            if expected is None:
+                raise ValueError(f"Showtime with ID {showtime_id} does not exist.")
+            conflict, new_bitmap = change(expected)
+            if conflict and fresh:
+                return False, conflict
+
+            if not conflict:
+                updated = db.execute(
+                    update(Showtime)
+                    .where(Showtime.showtime_id == showtime_id, Showtime.seat_bitmap == expected)
+                    .values(seat_bitmap=new_bitmap)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if updated:
+                    self._remember(showtime_id, new_bitmap)
+                    return True, 0
+
+            # Someone else changed the bitmap since we read it, or our mirror was stale (e.g. a release in another
+            # process or a rolled back booking): re-read and retry, and only report a conflict the database confirms
+            expected = self.get(showtime_id, refresh=True, db=db)
+            fresh = True
+
+        raise RuntimeError(f"Seat inventory of showtime {showtime_id} is too contended; please try again.")
+
+    def _remember(self, showtime_id, bitmap):
+        with self._lock:
+            self.bitmaps[showtime_id] = bitmap
+
+
+seat_inventory = SeatInventory()
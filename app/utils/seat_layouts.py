@@ -0,0 +1,243 @@
+"""
+Seat layouts of the theater screens (rows, seats per row, aisles, categories and prices).
+
+Every layout is compiled once into an immutable CompiledLayout (seat index <-> label, one bitmap mask per
+category) shared by all showtimes of that screen, so rendering a seat map or pricing a seat runs no extra
+queries. Seat i of a layout is bit i of the showtime's seat bitmap: seats are numbered row by row, starting
+with the row nearest the screen.
+"""
+import re
+import threading
+from types import MappingProxyType
+from typing import NamedTuple, Tuple, FrozenSet, Mapping
+from sqlalchemy import select, event, inspect
+from sqlalchemy.orm import Session
+from database import get_db  # Import the get_db function
+from schemas.models import SeatLayout, Showtime  # SQLAlchemy model
+from utils.model_events import subscribe
+from utils.catalog_cache import register_refresh_hook
+
+# The seat bitmap is a signed BIGINT, so a layout holds at most 63 seats
+MAX_SEATS = 63
+DEFAULT_SCREEN = "default"  # Screen name of the shared layout used by showtimes without a layout
+
+
+class SeatCategory(NamedTuple):
+    name: str
+    price: float
+    rows: str
+    mask: int  # bitmap of the category's seats
+
+
+class CompiledLayout(NamedTuple):
+    layout_id: int
+    rows: str
+    columns: int
+    gaps: FrozenSet[int]  # seat numbers followed by an aisle
+    sections: Tuple[Tuple[int, int], ...]  # (first, last) seat positions of each block of seats between aisles
+    labels: Tuple[str, ...]  # seat index -> label
+    indices: Mapping[str, int]  # label -> seat index
+    categories: Tuple[SeatCategory, ...]
+    row_categories: Tuple[SeatCategory, ...]  # row position -> category
+
+    @property
+    def seat_count(self):
+        return len(self.labels)
+
+    def index(self, seat_no: str):
+        """
+        Returns the seat index (bit position) of a seat label such as 'C7'.
+
+        Raises:
+        - ValueError: If the label is not a seat of the layout.
+        """
+        label = seat_no.strip().upper() if isinstance(seat_no, str) else seat_no
+        if label not in self.indices:
+            raise ValueError(f"Invalid seat number '{seat_no}'; seats are {self.labels[0]} to {self.labels[-1]}.")
+        return self.indices[label]
+
+    def label(self, index: int):
+        return self.labels[index]
+
+    def mask(self, seat_nos):
+        """
+        Returns the bitmap with the bits of the given seat labels set.
+        """
+        mask = 0
+        for seat_no in seat_nos:
+            mask |= 1 << self.index(seat_no)
+        return mask
+
+    def category(self, seat_no: str):
+        return self.row_categories[self.index(seat_no) // self.columns]
+
+    def category_named(self, name: str):
+        """
+        Returns the category with the given name (case-insensitive), or None.
+        """
+        for category in self.categories:
+            if category.name.lower() == name.strip().lower():
+                return category
+        return None
+
+
+def compile_layout(layout_id: int, rows: str, columns: int, gaps, categories):
+    """
+    Validates a layout and compiles it into a CompiledLayout.
+
+    Raises:
+    - ValueError: If the layout is malformed or holds more than MAX_SEATS seats.
+    """
+    rows = rows.strip().upper()
+    if not rows or not re.fullmatch(r"[A-Z]+", rows) or len(set(rows)) != len(rows):
+        raise ValueError(f"Layout {layout_id}: rows must be distinct letters, got '{rows}'.")
+    if columns < 1:
+        raise ValueError(f"Layout {layout_id}: a row needs at least one seat.")
+    if len(rows) * columns > MAX_SEATS:
+        raise ValueError(f"Layout {layout_id}: {len(rows) * columns} seats do not fit the {MAX_SEATS}-seat bitmap.")
+    gaps = frozenset(gaps or ())
+    if any(not 1 <= gap < columns for gap in gaps):
+        raise ValueError(f"Layout {layout_id}: aisles must sit between seats 1 and {columns}.")
+
+    labels = tuple(f"{row}{number}" for row in rows for number in range(1, columns + 1))
+    row_mask = (1 << columns) - 1
+    row_categories = [None] * len(rows)
+    compiled_categories = []
+    for category in categories:
+        category_rows = category["rows"].upper()
+        mask = 0
+        for row in category_rows:
+            if row not in rows or row_categories[rows.index(row)] is not None:
+                raise ValueError(f"Layout {layout_id}: row '{row}' of {category['name']} is unknown or already categorized.")
+            mask |= row_mask << rows.index(row) * columns
+        compiled = SeatCategory(category["name"], category["price"], category_rows, mask)
+        compiled_categories.append(compiled)
+        for row in category_rows:
+            row_categories[rows.index(row)] = compiled
+    if None in row_categories:
+        raise ValueError(f"Layout {layout_id}: every row needs a seat category.")
+
+    # Aisles split every row into sections; a block of adjacent seats never crosses one
+    bounds = [0] + sorted(gaps) + [columns]
+
+    return CompiledLayout(
+        layout_id=layout_id,
+        rows=rows,
+        columns=columns,
+        gaps=gaps,
+        sections=tuple((start, end - 1) for start, end in zip(bounds, bounds[1:])),
+        labels=labels,
+        indices=MappingProxyType({label: index for index, label in enumerate(labels)}),
+        categories=tuple(compiled_categories),
+        row_categories=tuple(row_categories),
+    )
+
+
+class SeatLayouts:
+    """
+    Compiled seat layouts, plus the layout of each showtime that has been looked up.
+    The layouts table is tiny, so it is loaded whole; a showtime's layout_id is fetched once and then cached.
+    """
+
+    def __init__(self):
+        self.layouts = {}  # layout_id -> CompiledLayout
+        self.default = None
+        self.showtime_layouts = {}  # showtime_id -> layout_id (None = default)
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        with next(get_db()) as db:
+            rows = db.execute(select(SeatLayout)).scalars().all()
+            layouts, default = {}, None
+            for row in rows:
+                layouts[row.layout_id] = compile_layout(row.layout_id, row.rows, row.columns, row.gaps, row.categories)
+                if row.theater_id is None and row.screen == DEFAULT_SCREEN:
+                    default = layouts[row.layout_id]
+
+        with self._lock:
+            self.layouts, self.default = layouts, default
+            self.showtime_layouts = {}
+            self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def for_showtime(self, showtime_id: int, db=None):
+        """
+        Returns the compiled layout of a showtime, or None if the showtime doesn't exist.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            if showtime_id in self.showtime_layouts:
+                return self._layout(self.showtime_layouts[showtime_id])
+
+        if db is None:
+            with next(get_db()) as db:
+                return self.for_showtime(showtime_id, db)
+
+        row = db.execute(select(Showtime.layout_id).where(Showtime.showtime_id == showtime_id)).first()
+        if row is None:
+            return None
+        with self._lock:
+            self.showtime_layouts[showtime_id] = row.layout_id
+            return self._layout(row.layout_id)
+
+    def forget_showtimes(self, showtime_ids):
+        with self._lock:
+            for showtime_id in showtime_ids:
+                self.showtime_layouts.pop(showtime_id, None)
+
+    def _layout(self, layout_id):
+        layout = self.default if layout_id is None else self.layouts.get(layout_id)
+        if layout is None:
+            raise ValueError(f"Seat layout {layout_id or DEFAULT_SCREEN} is not configured.")
+        return layout
+
+
+seat_layouts = SeatLayouts()
+
+def _reload_layouts(changes=None):
+    if seat_layouts.loaded:
+        seat_layouts.load()
+
+@event.listens_for(Session, "before_flush")
+def _protect_seat_bitmaps(session, flush_context, instances):
+    """
+    Seat i of a layout is bit i of the seat bitmap, so changing a layout's rows or columns, or moving a
+    showtime to a differently shaped layout, would silently move or drop the booked seats of a showtime.
+    Such changes are rejected while the showtime has booked or held seats. (Only ORM writes are checked.)
+    """
+    for obj in session.dirty:
+        if isinstance(obj, SeatLayout) and _changed(obj, "rows", "columns"):
+            uses_layout = Showtime.layout_id == obj.layout_id
+            if obj.theater_id is None and obj.screen == DEFAULT_SCREEN:
+                uses_layout = uses_layout | Showtime.layout_id.is_(None)
+            with session.no_autoflush:
+                booked = session.execute(
+                    select(Showtime.showtime_id).where(uses_layout, Showtime.seat_bitmap != 0).limit(1)
+                ).first()
+            if booked:
+                raise ValueError(
+                    f"Seat layout {obj.layout_id} has showtimes with booked seats; its rows and columns can't change."
+                )
+
+        elif isinstance(obj, Showtime) and _changed(obj, "layout_id") and obj.seat_bitmap:
+            seat_layouts.ensure_loaded()
+            old_layout_id = inspect(obj).attrs.layout_id.history.deleted
+            old = seat_layouts._layout(old_layout_id[0] if old_layout_id else None)
+            new = seat_layouts._layout(obj.layout_id)
+            if (old.rows, old.columns) != (new.rows, new.columns):
+                raise ValueError(
+                    f"Showtime {obj.showtime_id} has booked seats; it can't move to a seat layout of another shape."
+                )
+
+def _changed(obj, *attributes):
+    state = inspect(obj)
+    return any(state.attrs[attribute].history.has_changes() for attribute in attributes)
+
+subscribe(SeatLayout, lambda layout: None, _reload_layouts)
+# A showtime may have moved to another screen; look its layout up again next time
+subscribe(Showtime, lambda showtime: None, lambda changes: seat_layouts.forget_showtimes(changes))
+register_refresh_hook(_reload_layouts)
@@ -0,0 +1,210 @@
+"""
+Offline semantic index for free-text movie queries ("I'm feeling happy", "something scary for tonight").
+
+Movies are embedded with a signed hashing vectorizer over their description, genre and mood (expanded with
+everyday synonyms), so no model download or network call is needed. The matrix is built by an offline job
+and saved to disk; it is rebuilt on load when the catalog has changed since, or can be rebuilt by hand from
+the `app` directory:
+
+    python -m utils.semantic_index
+"""
+import os
+import zlib
+import threading
+import numpy as np
+from sqlalchemy import select
+from database import get_db  # Import the get_db function
+from schemas.models import Movie  # SQLAlchemy model
+from utils.movie_index import tokenize
+from utils.model_events import subscribe
+from utils.catalog_cache import register_refresh_hook
+
+SEMANTIC_INDEX_PATH = os.getenv(
+    "SEMANTIC_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "semantic_index.npz"),
+)
+
+HASH_DIMENSIONS = 2 ** 12
+
+STOP_WORDS = {
+    "a", "an", "and", "the", "of", "to", "in", "on", "for", "with", "about", "at", "by", "from", "into",
+    "is", "are", "was", "be", "i", "im", "m", "me", "my", "we", "you", "it", "its", "that", "this",
+    "something", "some", "movie", "movies", "film", "watch", "want", "like", "feel", "feeling", "am",
+}
+
+# Everyday words people use for each mood label, so intents like "happy" land on "Uplifting"/"Lighthearted"
+MOOD_SYNONYMS = {
+    "Intense": "intense gripping dark powerful edgy",
+    "Romantic": "romantic romance love date couple heartwarming",
+    "Adventurous": "adventurous adventure journey quest explore epic",
+    "Suspenseful": "suspenseful suspense mystery twist thrilling",
+    "Emotional": "emotional moving touching tearjerker sad cry",
+    "Inspiring": "inspiring inspirational motivating hopeful uplifting",
+    "Exciting": "exciting action thrilling fun adrenaline",
+    "Creepy": "creepy scary spooky horror eerie",
+    "Bittersweet": "bittersweet nostalgic melancholy sad sweet",
+    "Heroic": "heroic hero brave courage epic",
+    "Uplifting": "uplifting happy cheerful joyful hopeful positive feelgood",
+    "Tense": "tense nervous nailbiting thriller",
+    "Haunting": "haunting ghostly eerie dark scary",
+    "Engaging": "engaging interesting clever smart",
+    "Lighthearted": "lighthearted happy funny comedy cheerful light fun relaxing feelgood",
+}
+
+def _features(text: str):
+    tokens = [token for token in tokenize(text) if token not in STOP_WORDS]
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+def embed_texts(texts):
+    """
+    Embeds texts into L2-normalised float32 vectors with a signed hashing vectorizer.
+
+    Args:
+    - texts: List of strings.
+
+    Returns:
+    - NumPy array of shape (len(texts), HASH_DIMENSIONS).
+    """
+    vectors = np.zeros((len(texts), HASH_DIMENSIONS), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature in _features(text):
+            digest = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vectors[row, digest % HASH_DIMENSIONS] += sign
+
+    # Sublinear term frequency, then unit length so a dot product is the cosine similarity
+    np.copysign(np.log1p(np.abs(vectors)), vectors, out=vectors)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def movie_document(movie):
+    """
+    Builds the text embedded for a movie. Genre and mood are repeated so they outweigh incidental plot words.
+    """
+    genres = " ".join(movie.genre.split("/"))
+    synonyms = MOOD_SYNONYMS.get(movie.mood, "")
+    return " ".join([movie.movie_description, genres, genres, movie.mood, movie.mood, synonyms])
+
+def catalog_documents():
+    """
+    Returns the (movie_id, document) pair of every movie, by movie_id.
+    """
+    with next(get_db()) as db:
+        movies = db.execute(select(Movie).order_by(Movie.movie_id)).scalars().all()
+        return [(movie.movie_id, movie_document(movie)) for movie in movies]
+
+def catalog_fingerprint(documents):
+    """
+    Checksum of the embedded documents, saved with the matrix so a load can tell whether it is still current.
+    """
+    checksum = 0
+    for movie_id, document in documents:
+        checksum = zlib.crc32(f"{movie_id}\t{document}\n".encode("utf-8"), checksum)
+    return checksum
+
+def build_semantic_index(path: str = SEMANTIC_INDEX_PATH, documents=None):
+    """
+    Offline job: embeds every movie and saves the matrix (with the matching movie_ids) to `path`.
+    """
+    if documents is None:
+        documents = catalog_documents()
+    movie_ids = np.array([movie_id for movie_id, _ in documents], dtype=np.int64)
+    vectors = embed_texts([document for _, document in documents])
+
+    np.savez_compressed(path, vectors=vectors, movie_ids=movie_ids, fingerprint=catalog_fingerprint(documents))
+    return len(movie_ids)
+
+
+class SemanticIndex:
+    """
+    Loads the saved embedding matrix once and answers batched cosine top-k queries against it.
+
+    The file is rebuilt on load when it no longer matches the catalog; afterwards committed Movie changes are
+    embedded and patched into the loaded matrix.
+    """
+
+    def __init__(self, path: str = SEMANTIC_INDEX_PATH):
+        self.path = path
+        self.vectors = None
+        self.movie_ids = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        documents = catalog_documents()
+        with self._lock:
+            stale = not os.path.exists(self.path)
+            if not stale:
+                # Movies added, edited or deleted since the file was built (or a file saved without a fingerprint)
+                with np.load(self.path) as data:
+                    stale = "fingerprint" not in data.files or int(data["fingerprint"]) != catalog_fingerprint(documents)
+            if stale:
+                build_semantic_index(self.path, documents)
+            with np.load(self.path) as data:
+                self.vectors = data["vectors"]
+                self.movie_ids = data["movie_ids"]
+
+    def apply_changes(self, changes):
+        """
+        Patches committed Movie changes into the loaded matrix.
+
+        Args:
+        - changes: Dictionary of {movie_id: document or None}, where None marks a deleted movie.
+        """
+        with self._lock:
+            if self.vectors is None:
+                return  # Not loaded yet; the load checks the file against the catalog
+            keep = ~np.isin(self.movie_ids, list(changes))
+            updated = [(movie_id, document) for movie_id, document in changes.items() if document is not None]
+            vectors = np.vstack([self.vectors[keep], embed_texts([document for _, document in updated])])
+            movie_ids = np.concatenate([self.movie_ids[keep], np.array([movie_id for movie_id, _ in updated], dtype=np.int64)])
+            self.vectors, self.movie_ids = vectors, movie_ids
+
+    def search(self, queries, top_k: int = 5):
+        """
+        Returns the top_k (movie_id, similarity) pairs for each query, computed in one matrix product.
+
+        Args:
+        - queries: List of free-text queries.
+        - top_k: Number of movies to return per query, or None to rank the whole catalog.
+
+        Returns:
+        - One list of (movie_id, similarity) tuples per query, most similar first.
+        """
+        if self.vectors is None:
+            self.load()
+        with self._lock:
+            vectors, movie_ids = self.vectors, self.movie_ids
+        if not len(movie_ids):
+            return [[] for _ in queries]
+
+        scores = embed_texts(queries) @ vectors.T  # (queries, movies) cosine similarities
+        k = scores.shape[1] if top_k is None else min(top_k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates])]
+            results.append([
+                (int(movie_ids[column]), round(float(scores[row, column]), 3))
+                for column in ordered
+                if scores[row, column] > 0
+            ])
+        return results
+
+
+semantic_index = SemanticIndex()
+
+subscribe(Movie, movie_document, semantic_index.apply_changes)
+
+def _reload_after_remote_change():
+    # Another process rewrote movies; the load rebuilds the file if it no longer matches the catalog
+    if semantic_index.vectors is not None:
+        semantic_index.load()
+
+register_refresh_hook(_reload_after_remote_change)
+
+
+if __name__ == "__main__":
+    count = build_semantic_index()
+    print(f"Semantic index with {count} movies saved to {SEMANTIC_INDEX_PATH}")
@@ -0,0 +1,228 @@
+"""
+Precomputed distance matrix between every known location (suburb), plus the ranking of all theaters by
+distance from each location, so theaters can be ranked by the suburb a user names without geocoding or
+sorting at request time.
+
+Each location is placed at the centroid of its geocoded theaters, or at its own coordinates when none of its
+theaters is geocoded. The arrays are built by an offline job and saved to disk (SUBURB_DISTANCES_PATH). They
+are rebuilt on load when theaters or locations have changed since, and after committed Theater or Location
+changes; to rebuild them by hand, run from the `app` directory:
+
+    python -m utils.suburb_distances
+"""
+import os
+import zlib
+import threading
+from collections.abc import Sequence
+from typing import NamedTuple
+import numpy as np
+from sqlalchemy import select
+from database import get_db  # Import the get_db function
+from schemas.models import Location, Theater  # SQLAlchemy model
+from utils.geo import haversine_matrix
+from utils.locations import location_directory
+from utils.model_events import subscribe
+from utils.catalog_cache import register_refresh_hook
+
+SUBURB_DISTANCES_PATH = os.getenv(
+    "SUBURB_DISTANCES_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "suburb_distances.npz"),
+)
+
+def load_places():
+    """
+    Returns the (locations, theaters) rows the matrix is built from.
+    """
+    with next(get_db()) as db:
+        locations = db.execute(
+            select(Location.location_id, Location.latitude, Location.longitude).order_by(Location.location_id)
+        ).all()
+        theaters = db.execute(
+            select(Theater.theater_id, Theater.location_id, Theater.theater_location, Theater.latitude, Theater.longitude)
+            .order_by(Theater.theater_id)
+        ).all()
+    return locations, theaters
+
+def places_fingerprint(places):
+    """
+    Checksum of the locations and theaters, saved with the matrix so a load can tell whether it is still current.
+    """
+    checksum = 0
+    for rows in places:
+        for row in rows:
+            checksum = zlib.crc32(repr(tuple(row)).encode("utf-8"), checksum)
+    return checksum
+
+def build_suburb_distances(path: str = SUBURB_DISTANCES_PATH, places=None):
+    """
+    Offline job: computes the location-to-location distance matrix and, for every location, the theaters ordered
+    by distance from it, and saves them (with the location and theater ids) to `path`.
+
+    Returns:
+    - The number of locations in the matrix.
+    """
+    if places is None:
+        places = load_places()
+    locations, theaters = places
+
+    # Theaters not linked to a location yet are placed by their free-text location
+    location_directory.load()
+    theater_locations = [location_directory.location_of(theater._mapping) for theater in theaters]
+
+    sums = {}
+    for theater, location_id in zip(theaters, theater_locations):
+        if location_id is not None and theater.latitude is not None and theater.longitude is not None:
+            total = sums.setdefault(location_id, [0.0, 0.0, 0])
+            total[0] += theater.latitude
+            total[1] += theater.longitude
+            total[2] += 1
+
+    location_ids, coordinates = [], []
+    for location_id, latitude, longitude in locations:
+        if location_id in sums:
+            latitude_sum, longitude_sum, count = sums[location_id]
+            latitude, longitude = latitude_sum / count, longitude_sum / count
+        if latitude is not None and longitude is not None:
+            location_ids.append(location_id)
+            coordinates.append((latitude, longitude))
+
+    location_ids = np.array(location_ids, dtype=np.int64)
+    coordinates = np.array(coordinates, dtype=np.float64).reshape(-1, 2)
+    # float32 halves the size and is far more precise than a suburb centroid
+    distances = haversine_matrix(coordinates[:, 0], coordinates[:, 1], coordinates[:, 0], coordinates[:, 1]).astype(np.float32)
+
+    # Each theater is as far from a suburb as its own suburb is; theaters in no known location are left out
+    positions = {int(location_id): position for position, location_id in enumerate(location_ids)}
+    placed = [
+        (theater.theater_id, positions[location_id])
+        for theater, location_id in zip(theaters, theater_locations)
+        if location_id in positions
+    ]
+    theater_ids = np.array([theater_id for theater_id, _ in placed], dtype=np.str_)
+    theater_positions = np.array([position for _, position in placed], dtype=np.int32)
+
+    # Ranked in the order the tool pages through them: rounded distance, then theater_id
+    rankings = np.empty((len(location_ids), len(placed)), dtype=np.int32)
+    for row in range(len(location_ids)):
+        theater_distances = distances[row, theater_positions].tolist()
+        rankings[row] = sorted(range(len(placed)), key=lambda theater: (round(theater_distances[theater], 3), placed[theater][0]))
+
+    np.savez_compressed(
+        path,
+        location_ids=location_ids,
+        coordinates=coordinates,
+        distances=distances,
+        theater_ids=theater_ids,
+        theater_positions=theater_positions,
+        rankings=rankings,
+        fingerprint=places_fingerprint(places),
+    )
+    return len(location_ids)
+
+
+class RankedTheater(NamedTuple):
+    theater_id: str
+    location_id: int
+    distance_km: float  # suburb-to-suburb distance, rounded to meters
+
+
+class SuburbRanking(Sequence):
+    """
+    The theaters nearest a location first, read lazily from the saved arrays so a page only touches its own rows.
+    """
+
+    def __init__(self, matrix, position: int):
+        # Hold on to the arrays themselves, so a reload while paging can't mix two builds
+        self.location_ids = matrix.location_ids
+        self.theater_ids = matrix.theater_ids
+        self.theater_positions = matrix.theater_positions
+        self.distances = matrix.distances[position]
+        self.ranking = matrix.rankings[position]
+
+    def __len__(self):
+        return len(self.ranking)
+
+    def __getitem__(self, rank: int):
+        theater = int(self.ranking[rank])
+        position = int(self.theater_positions[theater])
+        return RankedTheater(
+            self.theater_ids[theater],
+            int(self.location_ids[position]),
+            round(float(self.distances[position]), 3),
+        )
+
+
+class SuburbDistances:
+    """
+    Loads the saved arrays once; a suburb's distances to every other suburb, and its ranking of every theater,
+    are then single row lookups.
+    """
+
+    def __init__(self, path: str = SUBURB_DISTANCES_PATH):
+        self.path = path
+        self.location_ids = None
+        self.positions = {}  # location_id -> row/column in the matrix
+        self.distances = None
+        self.theater_ids = []
+        self.theater_positions = None  # theater -> matrix position of its location
+        self.rankings = None  # location position -> theaters, nearest first
+        self._lock = threading.Lock()
+
+    def load(self):
+        places = load_places()
+        with self._lock:
+            stale = not os.path.exists(self.path)
+            if not stale:
+                # Theaters or locations changed since the file was built (or a file saved in an older format)
+                with np.load(self.path) as data:
+                    stale = "fingerprint" not in data.files or int(data["fingerprint"]) != places_fingerprint(places)
+            if stale:
+                build_suburb_distances(self.path, places)
+            with np.load(self.path) as data:
+                self.location_ids = data["location_ids"]
+                self.distances = data["distances"]
+                self.theater_ids = data["theater_ids"].tolist()
+                self.theater_positions = data["theater_positions"]
+                self.rankings = data["rankings"]
+            self.positions = {int(location_id): position for position, location_id in enumerate(self.location_ids)}
+
+    def from_location(self, location_id: int):
+        """
+        Returns {location_id: distance_km} from the given location to every location in the matrix,
+        or None when the location has no known coordinates.
+        """
+        if self.distances is None:
+            self.load()
+        position = self.positions.get(location_id)
+        if position is None:
+            return None
+        return dict(zip(self.location_ids.tolist(), self.distances[position].tolist()))
+
+    def theaters_near(self, location_id: int):
+        """
+        Returns the SuburbRanking of every theater by distance from the given location (a sequence of
+        RankedTheater, nearest first, ties by theater_id), or None when the location has no known coordinates.
+        """
+        if self.distances is None:
+            self.load()
+        position = self.positions.get(location_id)
+        if position is None:
+            return None
+        return SuburbRanking(self, position)
+
+
+suburb_distances = SuburbDistances()
+
+def _rebuild_after_change(changes=None):
+    # Theaters and locations change rarely; the load rebuilds the file only if it no longer matches them
+    if suburb_distances.distances is not None:
+        suburb_distances.load()
+
+subscribe(Theater, lambda theater: None, _rebuild_after_change)
+subscribe(Location, lambda location: None, _rebuild_after_change)
+register_refresh_hook(_rebuild_after_change)
+
+
+if __name__ == "__main__":
+    count = build_suburb_distances()
+    print(f"Distance matrix for {count} locations saved to {SUBURB_DISTANCES_PATH}")
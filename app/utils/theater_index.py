@@ -0,0 +1,326 @@
+import os
+import threading
+import numpy as np
+from math import floor, pi
+from collections import defaultdict
+from sqlalchemy import select, func, and_
+from database import get_db  # Import the get_db function
+from schemas.models import Theater  # SQLAlchemy model
+from utils.model_events import subscribe
+from utils.catalog_cache import register_refresh_hook
+from utils.geo import haversine_radians, haversine_matrix, bounding_box, KM_PER_DEGREE, EARTH_RADIUS_KM
+
+# Backend for the theater radius lookups:
+# - "memory": the in-process spatial index below (default)
+# - "bbox": a latitude/longitude bounding box pushed into SQL (ix_theaters_latitude_longitude), for deployments
+#   running several app nodes where an in-process index would need its own invalidation
+# - "earthdistance": the Postgres earthdistance earth_box prefilter (GiST index on ll_to_earth)
+THEATER_GEO_BACKEND = os.getenv("THEATER_GEO_BACKEND", "memory")
+
+THEATER_FIELDS = (
+    "theater_id",
+    "theater_name",
+    "theater_location",
+    "location_id",
+    "latitude",
+    "longitude",
+    "accessibility",
+)
+
+def theater_to_dict(theater):
+    """
+    Converts a Theater row into a plain dictionary of its columns.
+    """
+    return {field: getattr(theater, field) for field in THEATER_FIELDS}
+
+
+class TheaterSpatialIndex:
+    """
+    In-memory grid index over theater coordinates for radius and k-nearest queries.
+
+    Coordinates live in contiguous float64 arrays (radians, plus the cosine of the latitude), one slot per
+    theater, so distances are computed with a single vectorized haversine over the candidate slots. Theaters are
+    also bucketed into square cells of `cell_degrees` (about 5.5 km at the default), so a query only measures the
+    theaters in the cells overlapping its bounding box. Theaters without coordinates are not indexed.
+    Committed Theater writes are applied incrementally: new theaters take a free slot or are appended.
+
+    An optional `include` predicate builds a filtered index (e.g. accessible theaters only), so filtered
+    searches cost the same as unfiltered ones.
+    """
+
+    def __init__(self, cell_degrees: float = 0.05, include=None):
+        self.cell_degrees = cell_degrees
+        self.include = include
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self, capacity: int = 64):
+        self.theaters = {}  # theater_id -> theater row
+        self.cells = defaultdict(set)  # (lat cell, lon cell) -> slots
+        self.slots = {}  # theater_id -> slot
+        self.ids = []  # slot -> theater_id, None for a free slot
+        self.free = []  # free slots, reused before growing
+        self.lat = np.full(capacity, np.nan)
+        self.lon = np.full(capacity, np.nan)
+        self.cos_lat = np.full(capacity, np.nan)
+
+    def load(self):
+        """
+        (Re)builds the index from every geocoded theater.
+        """
+        with next(get_db()) as db:
+            rows = [theater_to_dict(theater) for theater in db.execute(select(Theater)).scalars().all()]
+
+        with self._lock:
+            self._reset(max(64, len(rows)))
+            for row in rows:
+                self._add(row)
+            self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def upsert(self, row: dict):
+        with self._lock:
+            self._remove(row["theater_id"])
+            self._add(row)
+
+    def remove(self, theater_id: str):
+        with self._lock:
+            self._remove(theater_id)
+
+    def within(self, lat: float, lon: float, radius_km: float):
+        """
+        Returns every theater within radius_km of the point, nearest first, each with its `distance_km`.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            slots = self._candidates(lat, lon, radius_km)
+            distances = self._distances(lat, lon, slots)
+            inside = distances <= radius_km  # NaN (free slots) compares False
+            slots, distances = slots[inside], distances[inside]
+            results = [
+                dict(self.theaters[self.ids[slot]], distance_km=round(float(distance), 3))
+                for slot, distance in zip(slots.tolist(), distances.tolist())
+            ]
+
+        results.sort(key=lambda theater: (theater["distance_km"], theater["theater_id"]))
+        return results
+
+    def nearest(self, lat: float, lon: float, k: int = 5, where=None):
+        """
+        Returns the k theaters closest to the point, nearest first, each with its `distance_km`.
+        An optional `where` predicate on the theater row skips theaters that don't qualify.
+        """
+        self.ensure_loaded()
+        # Grow the search radius until it holds k theaters; everything inside a radius is exact, so those are the k nearest
+        radius_km = self.cell_degrees * KM_PER_DEGREE
+        while True:
+            within = self.within(lat, lon, radius_km)
+            results = within if where is None else [row for row in within if where(row)]
+            if len(results) >= k or len(within) == len(self.theaters):
+                return results[:k]
+            radius_km *= 2
+
+    def distance_matrix(self, user_lats, user_lons):
+        """
+        Distances from many user locations to every indexed theater in one NumPy pass.
+
+        Returns:
+        - Tuple of (theater_ids, matrix), where matrix[i, j] is the distance in km from user i to theater_ids[j].
+        """
+        self.ensure_loaded()
+        with self._lock:
+            slots = np.flatnonzero(~np.isnan(self.lat[:len(self.ids)]))
+            theater_ids = [self.ids[slot] for slot in slots.tolist()]
+            lat, lon, cos_lat = self.lat[slots], self.lon[slots], self.cos_lat[slots]
+
+        user_lats = np.radians(np.asarray(user_lats, dtype=np.float64))[:, None]
+        user_lons = np.radians(np.asarray(user_lons, dtype=np.float64))[:, None]
+        return theater_ids, haversine_radians(user_lats, user_lons, np.cos(user_lats), lat, lon, cos_lat)
+
+    def nearest_for_users(self, user_lats, user_lons, chunk_size: int = 4096):
+        """
+        Batch job helper: the nearest theater for each user location, computed a chunk of users at a time.
+
+        Returns:
+        - One theater dictionary (with `distance_km`) per user, or None when no theater is indexed.
+        """
+        user_lats = np.asarray(user_lats, dtype=np.float64)
+        user_lons = np.asarray(user_lons, dtype=np.float64)
+        results = []
+        for start in range(0, len(user_lats), chunk_size):
+            theater_ids, matrix = self.distance_matrix(user_lats[start:start + chunk_size], user_lons[start:start + chunk_size])
+            if not theater_ids:
+                results.extend([None] * len(matrix))
+                continue
+            closest = matrix.argmin(axis=1)
+            results.extend(
+                dict(self.theaters[theater_ids[column]], distance_km=round(float(matrix[row, column]), 3))
+                for row, column in enumerate(closest.tolist())
+            )
+        return results
+
+    def _distances(self, lat, lon, slots):
+        lat, lon = np.radians(lat), np.radians(lon)
+        return haversine_radians(lat, lon, np.cos(lat), self.lat[slots], self.lon[slots], self.cos_lat[slots])
+
+    def _candidates(self, lat, lon, radius_km):
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+        rows = range(self._cell(min_lat), self._cell(max_lat) + 1)
+        columns = range(self._cell(min_lon), self._cell(max_lon) + 1)
+        if len(rows) * len(columns) >= len(self.cells):
+            # The box spans more cells than are occupied; measuring every slot in one pass is cheaper
+            return np.arange(len(self.ids))
+        cells = [self.cells[(row, column)] for row in rows for column in columns if (row, column) in self.cells]
+        return np.fromiter((slot for slots in cells for slot in slots), dtype=np.intp)
+
+    def _cell(self, degrees):
+        return floor(degrees / self.cell_degrees)
+
+    def _key(self, row):
+        return (self._cell(row["latitude"]), self._cell(row["longitude"]))
+
+    def _add(self, row):
+        if row["latitude"] is None or row["longitude"] is None:
+            return
+        if self.include is not None and not self.include(row):
+            return
+        if self.free:
+            slot = self.free.pop()
+            self.ids[slot] = row["theater_id"]
+        else:
+            slot = len(self.ids)
+            self.ids.append(row["theater_id"])
+            if slot == len(self.lat):
+                self._grow()
+        self.lat[slot] = np.radians(row["latitude"])
+        self.lon[slot] = np.radians(row["longitude"])
+        self.cos_lat[slot] = np.cos(self.lat[slot])
+
+        self.theaters[row["theater_id"]] = row
+        self.slots[row["theater_id"]] = slot
+        self.cells[self._key(row)].add(slot)
+
+    def _grow(self):
+        # Double the arrays so appends stay amortised O(1) and the data stays contiguous
+        capacity = 2 * len(self.lat)
+        for name in ("lat", "lon", "cos_lat"):
+            grown = np.full(capacity, np.nan)
+            grown[:len(self.ids) - 1] = getattr(self, name)[:len(self.ids) - 1]
+            setattr(self, name, grown)
+
+    def _remove(self, theater_id):
+        row = self.theaters.pop(theater_id, None)
+        if row is None:
+            return
+        slot = self.slots.pop(theater_id)
+        self.ids[slot] = None
+        self.lat[slot] = self.lon[slot] = self.cos_lat[slot] = np.nan
+        self.free.append(slot)
+
+        key = self._key(row)
+        self.cells[key].discard(slot)
+        if not self.cells[key]:
+            del self.cells[key]
+
+
+theater_index = TheaterSpatialIndex()
+accessible_theater_index = TheaterSpatialIndex(include=lambda row: row["accessibility"] is True)
+
+def _apply_theater_changes(changes):
+    for index in (theater_index, accessible_theater_index):
+        # Only patch an index that has been built; an unloaded one picks the changes up when it loads
+        if not index.loaded:
+            continue
+        for theater_id, row in changes.items():
+            if row is None:
+                index.remove(theater_id)
+            else:
+                # Upsert also drops a theater from a filtered index once it no longer qualifies
+                index.upsert(row)
+
+def _reload_after_remote_change():
+    # e.g. dataDump/theaters.py geocoded theaters in bulk
+    for index in (theater_index, accessible_theater_index):
+        if index.loaded:
+            index.load()
+
+subscribe(Theater, theater_to_dict, _apply_theater_changes)
+register_refresh_hook(_reload_after_remote_change)
+
+def nearby_condition(lat: float, lon: float, radius_km: float, accessible_only: bool = False):
+    """
+    Builds an index-backed WHERE clause selecting the candidate theaters around a point.
+    It is a superset of the radius, so callers still apply the exact distance check.
+    """
+    if accessible_only:
+        # Matches the partial indexes on accessible theaters
+        return and_(Theater.accessibility == True, nearby_condition(lat, lon, radius_km))
+    if THEATER_GEO_BACKEND == "earthdistance":
+        # The null checks match the predicate of the partial GiST index
+        return and_(
+            Theater.latitude.isnot(None),
+            Theater.longitude.isnot(None),
+            func.earth_box(func.ll_to_earth(lat, lon), radius_km * 1000).op("@>")(
+                func.ll_to_earth(Theater.latitude, Theater.longitude)
+            ),
+        )
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    return and_(Theater.latitude.between(min_lat, max_lat), Theater.longitude.between(min_lon, max_lon))
+
+def theaters_within(lat: float, lon: float, radius_km: float, db=None, accessible_only: bool = False):
+    """
+    Returns every theater within radius_km of the point, nearest first, each with its `distance_km`,
+    using the configured THEATER_GEO_BACKEND.
+    """
+    if THEATER_GEO_BACKEND == "memory":
+        index = accessible_theater_index if accessible_only else theater_index
+        return index.within(lat, lon, radius_km)
+
+    if db is None:
+        with next(get_db()) as db:
+            return theaters_within(lat, lon, radius_km, db, accessible_only)
+
+    candidates = [
+        theater_to_dict(theater)
+        for theater in db.execute(
+            select(Theater).where(nearby_condition(lat, lon, radius_km, accessible_only))
+        ).scalars().all()
+    ]
+    if not candidates:
+        return []
+
+    distances = haversine_matrix([lat], [lon], [row["latitude"] for row in candidates], [row["longitude"] for row in candidates])[0]
+    results = [
+        dict(row, distance_km=round(float(distance), 3))
+        for row, distance in zip(candidates, distances.tolist())
+        if distance <= radius_km
+    ]
+    results.sort(key=lambda theater: (theater["distance_km"], theater["theater_id"]))
+    return results
+
+def nearest_theaters(lat: float, lon: float, k: int = 5, db=None, accessible_only: bool = False, where=None):
+    """
+    Returns the k theaters closest to the point, nearest first, each with its `distance_km`,
+    using the configured THEATER_GEO_BACKEND. An optional `where` predicate on the theater row skips
+    theaters that don't qualify.
+    """
+    if THEATER_GEO_BACKEND == "memory":
+        index = accessible_theater_index if accessible_only else theater_index
+        return index.nearest(lat, lon, k, where)
+
+    if db is None:
+        with next(get_db()) as db:
+            return nearest_theaters(lat, lon, k, db, accessible_only, where)
+
+    # Grow the radius until it holds k theaters; a radius of half the Earth's circumference holds them all
+    radius_km = 5.0
+    while True:
+        within = theaters_within(lat, lon, radius_km, db, accessible_only)
+        results = within if where is None else [row for row in within if where(row)]
+        if len(results) >= k or radius_km >= pi * EARTH_RADIUS_KM:
+            return results[:k]
+        radius_km *= 4
@@ -0,0 +1,140 @@
+import bisect
+import threading
+from datetime import datetime
+from collections import defaultdict
+from sqlalchemy import select
+from database import get_db  # Import the get_db function
+from schemas.models import Showtime  # SQLAlchemy model
+from utils.model_events import subscribe
+from utils.catalog_cache import register_refresh_hook
+from utils.now_showing import hour_bucket
+
+SHOWTIME_FIELDS = ("showtime_id", "theater_id", "movie_id", "language", "show_time")
+
+def showtime_to_dict(showtime):
+    """
+    Converts a Showtime row into a plain dictionary of its columns.
+    """
+    return {field: getattr(showtime, field) for field in SHOWTIME_FIELDS}
+
+
+class TheaterSchedule:
+    """
+    In-memory upcoming schedule of every theater.
+
+    Each theater keeps a timeline sorted by (show_time, showtime_id, movie_id), so "what's on at this cinema
+    between X and Y" is two bisects and a slice. Showtimes that have started are trimmed as the clock moves on,
+    and committed Showtime writes are patched into the affected timelines.
+    """
+
+    def __init__(self):
+        self.timelines = defaultdict(list)  # theater_id -> sorted [(show_time, showtime_id, movie_id)]
+        self.showtimes = {}  # showtime_id -> showtime row
+        self.horizon = None  # earliest hour covered; older showtimes are not held
+        self.loaded = False
+        self._lock = threading.RLock()
+
+    def load(self):
+        """
+        (Re)builds every timeline from the showtimes from the current hour onwards.
+        """
+        horizon = hour_bucket(datetime.now())
+        with next(get_db()) as db:
+            rows = [
+                showtime_to_dict(showtime)
+                for showtime in db.execute(select(Showtime).where(Showtime.show_time >= horizon)).scalars().all()
+            ]
+
+        with self._lock:
+            self.timelines = defaultdict(list)
+            self.showtimes = {}
+            self.horizon = horizon
+            for row in rows:
+                self.showtimes[row["showtime_id"]] = row
+                self.timelines[row["theater_id"]].append(self._entry(row))
+            for timeline in self.timelines.values():
+                timeline.sort()
+            self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def covers(self, start: datetime):
+        """
+        Whether a window starting at `start` can be answered from the schedule (it does not hold past showtimes).
+        """
+        self.ensure_loaded()
+        self.trim()
+        return start >= self.horizon
+
+    def trim(self):
+        """
+        Drops the showtimes of hours that have fully passed from every timeline.
+        """
+        horizon = hour_bucket(datetime.now())
+        with self._lock:
+            if self.horizon is None or horizon <= self.horizon:
+                return
+            for theater_id in list(self.timelines):
+                timeline = self.timelines[theater_id]
+                expired = bisect.bisect_left(timeline, (horizon,))
+                for _, showtime_id, _ in timeline[:expired]:
+                    self.showtimes.pop(showtime_id, None)
+                del timeline[:expired]
+                if not timeline:
+                    del self.timelines[theater_id]
+            self.horizon = horizon
+
+    def between(self, theater_id: str, start: datetime, end: datetime = None):
+        """
+        Returns the showtimes of a theater between `start` and `end` (inclusive; open ended when end is None),
+        in chronological order.
+        """
+        self.ensure_loaded()
+        self.trim()
+        with self._lock:
+            timeline = self.timelines.get(theater_id, [])
+            low = bisect.bisect_left(timeline, (start,))
+            high = len(timeline) if end is None else bisect.bisect_right(timeline, (end, float("inf")))
+            return [dict(self.showtimes[showtime_id]) for _, showtime_id, _ in timeline[low:high]]
+
+    def apply(self, changes):
+        """
+        Applies committed showtime changes ({showtime_id: showtime row or None}).
+        """
+        with self._lock:
+            for showtime_id, row in changes.items():
+                self._remove(showtime_id)
+                if row is not None and row["show_time"] >= self.horizon:
+                    self.showtimes[showtime_id] = row
+                    bisect.insort(self.timelines[row["theater_id"]], self._entry(row))
+
+    def _entry(self, row):
+        return (row["show_time"], row["showtime_id"], row["movie_id"])
+
+    def _remove(self, showtime_id):
+        row = self.showtimes.pop(showtime_id, None)
+        if row is None:
+            return
+        timeline = self.timelines[row["theater_id"]]
+        index = bisect.bisect_left(timeline, self._entry(row))
+        if index < len(timeline) and timeline[index][1] == showtime_id:
+            del timeline[index]
+        if not timeline:
+            del self.timelines[row["theater_id"]]
+
+
+theater_schedule = TheaterSchedule()
+
+def _apply_showtime_changes(changes):
+    # Only patch a schedule that has been built; an unloaded one picks the changes up when it loads
+    if theater_schedule.loaded:
+        theater_schedule.apply(changes)
+
+def _reload_after_remote_change():
+    if theater_schedule.loaded:
+        theater_schedule.load()
+
+subscribe(Showtime, showtime_to_dict, _apply_showtime_changes)
+register_refresh_hook(_reload_after_remote_change)
@@ -0,0 +1,12 @@
+from sqlalchemy import text
+
+# Running app servers LISTEN on this channel (see app/utils/catalog_cache.py) and drop their cached catalog
+# and rebuild their in-memory indexes (movies, now showing, theater spatial index, ...)
+CATALOG_CHANNEL = "movie_catalog_changed"
+
+def notify_catalog_changed(session):
+    # Only Postgres has LISTEN/NOTIFY; on other databases (e.g. a local SQLite copy) this is a no-op
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    # Delivered when the surrounding transaction commits
+    session.execute(text("SELECT pg_notify(:channel, '')"), {"channel": CATALOG_CHANNEL})
@@ -2,6 +2,7 @@ import json
 from sqlalchemy import create_engine, Column, Integer, String, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from catalog_notify import notify_catalog_changed
 
 # Define the database model
 Base = declarative_base()
@@ -47,6 +48,7 @@ for movie in movies_data:
     session.add(movie_entry)
 
 # Commit the session
+notify_catalog_changed(session)
 session.commit()
 
 print("Movies data inserted successfully!")
\ No newline at end of file
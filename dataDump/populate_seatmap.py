@@ -10,7 +10,9 @@ from sqlalchemy import (
     DateTime,
     Enum,
     Float,
-    Boolean
+    Boolean,
+    BigInteger,
+    JSON
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
@@ -45,6 +47,21 @@ class Showtime(Base):
     movie_id = Column(Integer, ForeignKey('movies.movie_id'), nullable=False)
     language = Column(String, nullable=False)
     show_time = Column(DateTime, nullable=False)
+    seat_bitmap = Column(BigInteger, nullable=False, default=0)  # Bit i set = seat i of the layout booked
+    layout_id = Column(Integer, ForeignKey('seat_layouts.layout_id'), nullable=True)  # None = the default seat layout
+
+
+# Seat Layouts Table
+class SeatLayout(Base):
+    __tablename__ = 'seat_layouts'
+
+    layout_id = Column(Integer, primary_key=True, autoincrement=True)
+    theater_id = Column(String, nullable=True)  # None for the shared default layout
+    screen = Column(String, nullable=False)
+    rows = Column(String, nullable=False)  # Row letters, starting with the row nearest the screen
+    columns = Column(Integer, nullable=False)  # Seats per row
+    gaps = Column(JSON, nullable=False)
+    categories = Column(JSON, nullable=False)  # [{"name": ..., "rows": ..., "price": ...}]
 
 
 # Step 2: Populate seatmap
@@ -57,16 +74,14 @@ def populate_seatmap():
             print("No showtimes found in the database.")
             return
 
-        # Row and column definitions
-        rows = ["A", "B", "C", "D", "E", "F", "G"]  # Rows A-G
-        columns = list(range(1, 10))  # Columns 1-9
-
-        # Seat category pricing
-        seat_categories = {
-            "Recliner": {"rows": ["A", "B"], "price": 700},
-            "Gold": {"rows": ["C", "D"], "price": 500},
-            "Silver": {"rows": ["E", "F", "G"], "price": 300},
-        }
+        # Rows, columns and category pricing come from the seat layout of each showtime's screen
+        layouts = {layout.layout_id: layout for layout in session.query(SeatLayout).all()}
+        default_layout = next(
+            (layout for layout in layouts.values() if layout.theater_id is None and layout.screen == "default"), None
+        )
+        if default_layout is None:
+            print("The default seat layout is missing; run the migrations first.")
+            return
 
         # Randomly select up to 200 entries to populate
         total_seats_to_fill = 200
@@ -76,16 +91,18 @@ def populate_seatmap():
             # Randomly select a showtime
             showtime = random.choice(showtimes)
 
+            layout = layouts.get(showtime.layout_id, default_layout)
+
             # Randomly select a seat
-            row = random.choice(rows)
-            col = random.choice(columns)
+            row = random.choice(layout.rows)
+            col = random.randint(1, layout.columns)
             seat_no = f"{row}{col}"  # Example: A1, B5
 
             # Determine seat category and price
-            for category, details in seat_categories.items():
-                if row in details["rows"]:
-                    seat_category = category
-                    seat_price = details["price"]
+            for category in layout.categories:
+                if row in category["rows"]:
+                    seat_category = category["name"]
+                    seat_price = category["price"]
                     break
 
             # Randomly decide if the seat is occupied or unoccupied
@@ -109,6 +126,10 @@ def populate_seatmap():
                 session.add(new_seat)
                 seats_filled += 1
 
+                # Keep the showtime's seat bitmap in step with the booked seats
+                if seat_status:
+                    showtime.seat_bitmap |= 1 << (layout.rows.index(row) * layout.columns + col - 1)
+
         # Commit all entries to the database
         session.commit()
         print(f"{seats_filled} seats successfully populated in the seatmap!")
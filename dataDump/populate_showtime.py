@@ -15,6 +15,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
+from catalog_notify import notify_catalog_changed
 
 Base = declarative_base()
 
@@ -122,6 +123,7 @@ def populate_showtimes():
                 current_time += timedelta(hours=random_interval)
 
         # Commit all new showtimes to the database
+        notify_catalog_changed(session)
         session.commit()
         print("Showtimes successfully populated with randomized intervals for the next month!")
 
@@ -7,6 +7,7 @@ import random
 from sqlalchemy.orm import sessionmaker
 # from app.schemas.models import Movie, Review
 from datetime import datetime
+from catalog_notify import notify_catalog_changed
 
 Base = declarative_base()
 
@@ -162,7 +163,8 @@ def generate_reviews():
             avg_rating = round(total_rating / num_reviews, 1)  # Average rating rounded to 1 decimal place
             movie.average_rating = avg_rating
 
-        # Commit the transaction
+        # Commit the transaction (average_rating changed, so cached catalog rows are stale)
+        notify_catalog_changed(session)
         session.commit()
         print("Reviews and average ratings added successfully!")
 
@@ -1,21 +1,44 @@
+import os
+import re
 import json
-import googlemaps
-from sqlalchemy import create_engine, Column, String, Float, Boolean
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, Column, String, Integer, Float, Boolean, ForeignKey, update, select, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from catalog_notify import notify_catalog_changed
 
-# Initialize Google Maps client
+# Geocoder used for the lookups: "google" (Google Maps API) or "fixture" (offline coordinates from geocode_fixture.json)
+GEOCODER = os.getenv("GEOCODER", "google")
 GOOGLE_MAPS_API_KEY = ""  # Replace with your actual API key
-gmaps = googlemaps.Client(key=GOOGLE_MAPS_API_KEY)
+# City appended to every suburb, so "Andheri" is looked up as "Andheri, Mumbai"
+GEOCODE_CITY = "Mumbai"
+GEOCODE_WORKERS = int(os.getenv("GEOCODE_WORKERS", "8"))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GEOCODE_CACHE_PATH = os.path.join(BASE_DIR, "geocode_cache.json")
+GEOCODE_FIXTURE_PATH = os.path.join(BASE_DIR, "geocode_fixture.json")
 
 # Define the database model
 Base = declarative_base()
 
+class Location(Base):
+    __tablename__ = 'locations'
+    location_id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, nullable=False, unique=True)
+    name_key = Column(String, nullable=False, unique=True, index=True)  # Case-folded name
+
+class LocationAlias(Base):
+    __tablename__ = 'location_aliases'
+    alias_key = Column(String, primary_key=True)  # Case-folded alternative name, e.g. "andheri west"
+    location_id = Column(Integer, ForeignKey('locations.location_id'), nullable=False, index=True)
+
 class Theater(Base):
     __tablename__ = 'theaters'
     theater_id = Column(String, primary_key=True)  # UUID as a string
     theater_name = Column(String, nullable=False)
     theater_location = Column(String, nullable=False)
+    location_id = Column(Integer, ForeignKey('locations.location_id'), nullable=True, index=True)  # Resolved theater_location
     latitude = Column(Float, nullable=True)  # New column for latitude
     longitude = Column(Float, nullable=True)  # New column for longitude
     accessibility = Column(Boolean, nullable=True)  # New column for accessibility
@@ -31,34 +54,142 @@ Base.metadata.create_all(engine)
 Session = sessionmaker(bind=engine)
 session = Session()
 
-# Function to get latitude and longitude for a location
-def get_lat_lon(location):
-    try:
-        geocode_result = gmaps.geocode(location)
+def normalize_location(location):
+    # "  Vile  Parle " and "vile parle" share one lookup and one cache entry
+    return re.sub(r"\s+", " ", location).strip().casefold()
+
+class GoogleMapsGeocoder:
+    def __init__(self, api_key):
+        import googlemaps
+        self.client = googlemaps.Client(key=api_key)
+
+    def geocode(self, location):
+        geocode_result = self.client.geocode(f"{location}, {GEOCODE_CITY}")
         if geocode_result:
-            lat = geocode_result[0]['geometry']['location']['lat']
-            lng = geocode_result[0]['geometry']['location']['lng']
-            return lat, lng
-    except Exception as e:
-        print(f"Error fetching geocode for {location}: {e}")
-    return None, None
-
-# Fetch all theaters from the database
-theaters = session.query(Theater).all()
-
-# Update latitude and longitude for each theater
-for theater in theaters:
-    if theater.latitude is None or theater.longitude is None:  # Only update if not already set
-        print(f"Fetching coordinates for location: {theater.theater_location}")
-        latitude, longitude = get_lat_lon(theater.theater_location)
-        if latitude is not None and longitude is not None:
-            theater.latitude = latitude
-            theater.longitude = longitude
-            print(f"Updated {theater.theater_name} with lat: {latitude}, lon: {longitude}")
+            coordinates = geocode_result[0]['geometry']['location']
+            return coordinates['lat'], coordinates['lng']
+        return None, None
+
+class FixtureGeocoder:
+    # Offline provider: looks locations up in a JSON file of {normalized location: [lat, lon]}
+    def __init__(self, path=GEOCODE_FIXTURE_PATH):
+        with open(path, 'r') as file:
+            self.coordinates = json.load(file)
+
+    def geocode(self, location):
+        return tuple(self.coordinates.get(normalize_location(location), (None, None)))
+
+def get_geocoder(name=GEOCODER):
+    if name == "fixture":
+        return FixtureGeocoder()
+    return GoogleMapsGeocoder(GOOGLE_MAPS_API_KEY)
+
+class GeocodeCache:
+    # On-disk cache of {normalized location: [lat, lon]}, so re-runs only look up new locations
+    def __init__(self, path=GEOCODE_CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                self.entries = json.load(file)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, coordinates):
+        with self.lock:
+            self.entries[key] = list(coordinates)
+
+    def save(self):
+        with self.lock:
+            with open(self.path, 'w') as file:
+                json.dump(self.entries, file, indent=4, sort_keys=True)
+
+def geocode_locations(locations, geocoder, cache, workers=GEOCODE_WORKERS):
+    """
+    Geocodes the distinct locations concurrently (bounded by `workers`), serving repeats from the cache.
+    Returns {normalized location: (lat, lon)} for every location that could be resolved.
+    """
+    def lookup(key, location):
+        try:
+            latitude, longitude = geocoder.geocode(location)
+        except Exception as e:
+            print(f"Error fetching geocode for {location}: {e}")
+            return key, None
+        if latitude is None or longitude is None:
+            print(f"Could not fetch coordinates for {location}")
+            return key, None
+        cache.put(key, (latitude, longitude))
+        return key, (latitude, longitude)
+
+    # Deduplicate: one lookup per normalized location, however many theaters share it
+    pending = {}
+    resolved = {}
+    for location in locations:
+        key = normalize_location(location)
+        if cache.get(key) is not None:
+            resolved[key] = tuple(cache.get(key))
         else:
-            print(f"Could not fetch coordinates for {theater.theater_location}")
+            pending.setdefault(key, location)
+
+    print(f"{len(resolved)} locations cached, {len(pending)} to geocode with {GEOCODER}")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for key, coordinates in executor.map(lambda item: lookup(*item), pending.items()):
+            if coordinates is not None:
+                resolved[key] = coordinates
+
+    cache.save()
+    return resolved
+
+def update_theater_coordinates():
+    # Only theaters that are missing coordinates are geocoded
+    theaters = session.query(Theater.theater_id, Theater.theater_location).filter(
+        (Theater.latitude.is_(None)) | (Theater.longitude.is_(None))
+    ).all()
+    if not theaters:
+        print("All theaters already have coordinates.")
+        return
+
+    coordinates = geocode_locations(
+        [theater.theater_location for theater in theaters], get_geocoder(), GeocodeCache()
+    )
+
+    # Bulk UPDATE by primary key: a single executemany instead of one UPDATE per theater
+    updates = [
+        {"theater_id": theater.theater_id, "latitude": latitude, "longitude": longitude}
+        for theater in theaters
+        for latitude, longitude in [coordinates.get(normalize_location(theater.theater_location), (None, None))]
+        if latitude is not None
+    ]
+    if updates:
+        session.execute(update(Theater), updates)
+        notify_catalog_changed(session)
+    session.commit()
+
+    print(f"Latitude and Longitude updated for {len(updates)} of {len(theaters)} theaters!")
+
+def link_theater_locations():
+    # Theaters added after the locations migration have no location_id yet: resolve their free-text location
+    # by canonical name first, then by a known alias, in one UPDATE
+    location_key = func.lower(func.trim(Theater.theater_location))
+    by_name = select(Location.location_id).where(Location.name_key == location_key).scalar_subquery()
+    by_alias = select(LocationAlias.location_id).where(LocationAlias.alias_key == location_key).scalar_subquery()
+    resolved = func.coalesce(by_name, by_alias)
+    linked = session.execute(
+        update(Theater)
+        .where(Theater.location_id.is_(None), resolved.isnot(None))
+        .values(location_id=resolved)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    unresolved = session.query(Theater.theater_location).filter(Theater.location_id.is_(None)).distinct().all()
+    if linked:
+        notify_catalog_changed(session)
+    session.commit()
 
-# Commit the updates to the database
-session.commit()
+    print(f"Location linked for {linked} theaters.")
+    for (location,) in unresolved:
+        print(f"Unknown location '{location}'; add it (or an alias) to the locations table")
 
-print("Latitude and Longitude updated successfully for all theaters!")
\ No newline at end of file
+update_theater_coordinates()
+link_theater_locations()